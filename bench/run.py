@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark and regression suite for redrose-maintain.
+
+Everything runs against bench/standin.py on 127.0.0.1 with throwaway
+cache/state dirs and a package manifest pointing at the stand-in, so no
+network is needed. Suites:
+
+  checker   VersionChecker end to end over the normal, large, slow and
+            failing upstream variants: cold (empty caches), warm (within
+            the TTL) and revalidating (TTL 0, conditional requests), with
+            the time each package's result arrived. All stand-ins share one
+            host, so MAX_CONNECTIONS_PER_HOST applies to all of them.
+  parsers   iter_json_array and version_key over a 20000-tag list, and the
+            regex fetcher over a large index page: throughput and peak
+            memory (tracemalloc)
+  startup   cold start of src/main.py (see bench/startup.py)
+  builds    the build engine on a synthetic autotools package: clean,
+            incremental (same version, then one changed file) and a
+            build-cache restore, with per-phase times
+
+Every run checks its results against EXPECTED, the answers the fixtures
+must produce (latest versions, which packages fail, build states); any
+mismatch is reported as WRONG and the run exits with status 1, so a fast
+wrong answer never passes for a speedup.
+
+Results are JSON (--json, or --out FILE). --compare BASELINE.json flags
+every timing more than --threshold times slower (or throughput that
+much lower) than the baseline, and any change in the answers above, and
+exits with status 1.
+
+Usage: python3 bench/run.py [--only SUITE,...] [--json] [--out FILE]
+                            [--compare BASELINE.json] [--threshold 1.25]
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(BENCH, "..", "src")
+SUITES = ("checker", "parsers", "startup", "builds")
+
+sys.path.insert(0, BENCH)
+import standin  # noqa: E402
+
+# Latest version per stand-in variant (None: the check must fail)
+_VARIANT_LATEST = {
+    "normal": {"coreutils": "9.9", "bash": "5.3", "curl": "8.17.1"},
+    "large": {"coreutils": "49.19.18", "bash": "5.3", "curl": "24.9.9"},
+    "slow": {"coreutils": "9.9", "bash": "5.3", "curl": "8.17.1"},
+    "fail": {"coreutils": None, "bash": None, "curl": None},
+}
+_CHECKER_LATEST = dict({f"{pkg}{'' if variant == 'normal' else '-' + variant}": latest
+                        for variant, pkgs in _VARIANT_LATEST.items()
+                        for pkg, latest in pkgs.items()}, bench="1.1")
+
+# What the fixtures must produce: {dotted path: value}
+EXPECTED = {
+    **{f"checker.{run}.latest.{name}": latest
+       for run in ("cold", "warm", "revalidate") for name, latest in _CHECKER_LATEST.items()},
+    "parsers.iter_json_array.items": standin.LARGE_TAGS,
+    "parsers.version_sort.latest": "49.19.18",
+    "parsers.regex_scan.latest": "24.9.9",
+    **{f"builds.{name}.state": "done" for name in
+       ("clean", "incremental_first", "incremental_same", "incremental_next",
+        "cache_store", "cache_restore")},
+    "builds.cache_restore.cached": True,
+}
+# Answers that must not change between a baseline and a later run
+ANSWER_KEYS = ("latest", "ok", "failed", "state", "cached", "items")
+
+def manifest(url):
+    """Package manifest pointing every source at the stand-in."""
+    probe = {"command": ["sh", "-c", "echo 1.0"], "regex": "([0-9.]+)"}
+    def regex(variant, what, pattern, pick):
+        return {"type": "regex", "url": f"{url}/{variant}/{what}", "regex": pattern, "pick": pick,
+                "comment": "#" if what == "PKGBUILD" else None}
+    basever = "^\\s*_basever\\s*=\\s*[\"']?([0-9]+\\.[0-9]+)"
+    curl = "curl-([0-9]+\\.[0-9]+\\.[0-9]+)\\.tar\\.gz"
+    recipe = {"url": f"{url}/src/bench-{{version}}.tar.gz", "bin_dir": "src"}
+    packages = {}
+    for variant in standin.VARIANTS:
+        suffix = "" if variant == "normal" else f"-{variant}"
+        packages[f"coreutils{suffix}"] = {
+            "source": {"type": "github-tags",
+                       "repo": "coreutils/coreutils" if variant == "normal" else f"{variant}/coreutils"},
+            "recipe": recipe, "probe": probe}
+        packages[f"bash{suffix}"] = {"source": regex(variant, "PKGBUILD", basever, "first"),
+                                     "recipe": recipe, "probe": probe}
+        packages[f"curl{suffix}"] = {"source": regex(variant, "curl/download/", curl, "max"),
+                                     "recipe": recipe, "probe": probe}
+    packages["bench"] = {"source": {"type": "regex", "url": f"{url}/src/",
+                                    "regex": "bench-([0-9.]+)\\.tar\\.gz", "pick": "max"},
+                         "recipe": recipe, "probe": probe}
+    return {"packages": packages}
+
+# -----------------------------
+# Suites
+# -----------------------------
+def bench_checker(main, server, work):
+    def run_check():
+        results = {}
+        before = sum(server.requests.values())
+        started = time.perf_counter()
+        main.VersionChecker(update_callback=lambda name, latest, up, ok: results.__setitem__(
+            name, {"latest": latest, "ok": ok,
+                   "at_s": round(time.perf_counter() - started, 4)})).run()
+        return {"elapsed_s": round(time.perf_counter() - started, 4),
+                "requests": sum(server.requests.values()) - before,
+                "ok": sorted(n for n, r in results.items() if r["ok"]),
+                "failed": sorted(n for n, r in results.items() if not r["ok"]),
+                "latest": {n: r["latest"] for n, r in sorted(results.items())},
+                "result_at_s": {n: r["at_s"] for n, r in sorted(results.items())}}
+
+    for sub in ("http", "tags"):
+        shutil.rmtree(os.path.join(work, "cache", sub), ignore_errors=True)
+    out = {"cold": run_check(), "warm": run_check()}
+    main._http_cache.ttl = 0
+    main.HTTP_CACHE_TTL = 0
+    out["revalidate"] = run_check()
+    main._http_cache.ttl = main.HTTP_CACHE_TTL = 600
+    return out
+
+def _timed(fn, repeat=3):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        value = fn()
+        samples.append(time.perf_counter() - started)
+    return value, min(samples)
+
+def _peak_memory(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def bench_parsers(main, server, work):
+    out = {}
+    text = json.dumps(standin.large_tags())
+    mb = len(text.encode()) / 1024 ** 2
+
+    def chunks():
+        return (text[i:i + main.HTTP_CHUNK_SIZE] for i in range(0, len(text), main.HTTP_CHUNK_SIZE))
+    count, secs = _timed(lambda: sum(1 for _ in main.iter_json_array(chunks())))
+    _, load_secs = _timed(lambda: json.loads(text))
+    out["iter_json_array"] = {"input_mb": round(mb, 2), "items": count,
+                              "mb_per_s": round(mb / secs, 2),
+                              "peak_mb": round(_peak_memory(lambda: sum(1 for _ in main.iter_json_array(chunks())))
+                                               / 1024 ** 2, 2),
+                              "json_loads_peak_mb": round(_peak_memory(lambda: json.loads(text)) / 1024 ** 2, 2),
+                              "json_loads_mb_per_s": round(mb / load_secs, 2)}
+
+    names = [t["name"] for t in standin.large_tags()]
+    def sort_cold():
+        main.version_key.cache_clear()
+        return sorted(names, key=main.version_key)
+    _, cold = _timed(sort_cold)
+    _, warm = _timed(lambda: sorted(names, key=main.version_key))
+    out["version_sort"] = {"tags": len(names), "cold_s": round(cold, 4), "warm_s": round(warm, 4),
+                           "latest": main.latest_version(names)}
+
+    source = {"type": "regex", "url": f"{server.url}/large/curl/download/",
+              "regex": "curl-([0-9]+\\.[0-9]+\\.[0-9]+)\\.tar\\.gz", "pick": "max"}
+    page_mb = len(standin.large_curl_page()) / 1024 ** 2
+    main._http_cache.ttl = 0  # revalidate: the body comes from the cache, the 304 from the stand-in
+    main._fetch_regex("warm-up", source, lambda msg: None)
+    latest, secs = _timed(lambda: main._fetch_regex("curl-large", source, lambda msg: None))
+    main._http_cache.ttl = main.HTTP_CACHE_TTL
+    out["regex_scan"] = {"input_mb": round(page_mb, 2), "mb_per_s": round(page_mb / secs, 2),
+                         "latest": latest,
+                         "peak_mb": round(_peak_memory(
+                             lambda: main._fetch_regex("curl-large", source, lambda msg: None))
+                             / 1024 ** 2, 2)}
+    return out
+
+def bench_startup(runs):
+    import startup
+    return startup.measure(runs)
+
+def bench_builds(work):
+    missing = [tool for tool in ("cc", "make") if not shutil.which(tool)]
+    if missing:
+        return {"skipped": f"{', '.join(missing)} not installed"}
+    import engine
+
+    def build(version, **options):
+        # A fresh output dir each time, so a clean build never finds old objects
+        out_dir = tempfile.mkdtemp(prefix="out-", dir=work)
+        started = time.perf_counter()
+        scheduler = engine.BuildScheduler(out_dir=out_dir, log=lambda msg: None, **options)
+        b = scheduler.run([("bench", version)])[0]
+        return {"state": b.state, "error": b.error, "jobs": b.jobs, "cached": b.cached,
+                "wall_s": round(time.perf_counter() - started, 3), "phase_times": b.phase_times}
+
+    return {
+        "clean": build("1.0", use_cache=False),
+        "incremental_first": build("1.0", use_cache=False, incremental=True),
+        "incremental_same": build("1.0", use_cache=False, incremental=True),
+        "incremental_next": build("1.1", use_cache=False, incremental=True),
+        "cache_store": build("1.0"),
+        "cache_restore": build("1.0"),
+    }
+
+# -----------------------------
+# Comparison
+# -----------------------------
+def _metrics(tree, prefix=""):
+    """Flatten to {dotted.path: number} for timings and throughputs."""
+    flat = {}
+    for key, value in tree.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_metrics(value, path + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+def _leaves(tree, prefix=""):
+    """Flatten to {dotted.path: value} for every leaf."""
+    flat = {}
+    for key, value in tree.items():
+        if isinstance(value, dict):
+            flat.update(_leaves(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+def check(results):
+    """Return the mismatches of results against EXPECTED, as readable lines."""
+    got = _leaves(results["results"])
+    wrong = []
+    for path, want in sorted(EXPECTED.items()):
+        suite = path.split(".", 1)[0]
+        if suite not in results["results"] or "skipped" in results["results"][suite]:
+            continue
+        if got.get(path) != want:
+            wrong.append(f"{path}: expected {want!r}, got {got.get(path)!r}")
+    return wrong
+
+def _answers(tree):
+    return {path: value for path, value in _leaves(tree).items()
+            if any(f".{key}" in f".{path}" for key in ANSWER_KEYS)}
+
+def compare(results, baseline, threshold):
+    """Return the regressions of results against baseline, as readable lines."""
+    now = _metrics(results["results"])
+    then = _metrics(baseline["results"])
+    regressions = []
+    now_answers = _answers(results["results"])
+    for path, old in sorted(_answers(baseline["results"]).items()):
+        if path in now_answers and now_answers[path] != old:
+            regressions.append(f"{path}: {old!r} -> {now_answers[path]!r} (answer changed)")
+    for path, old in sorted(then.items()):
+        new = now.get(path)
+        if new is None or not old:
+            continue
+        if path in now_answers:
+            continue
+        if path.endswith("_per_s"):
+            if new and old / new > threshold:
+                regressions.append(f"{path}: {old} -> {new} ({old / new:.2f}x lower)")
+        elif path.endswith(("_s", "_ms")) or ".phase_times." in path:
+            # Ignore sub-10ms jitter on tiny timings
+            small = old < 0.01 if not path.endswith("_ms") else old < 10
+            if not small and new / old > threshold:
+                regressions.append(f"{path}: {old} -> {new} ({new / old:.2f}x slower)")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--only", help=f"comma-separated suites to run (default: {','.join(SUITES)})")
+    parser.add_argument("-n", "--runs", type=int, default=10, help="startup samples per case")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parser.add_argument("--out", help="also write the JSON results to this file")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON results to check for regressions")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="slowdown factor that counts as a regression (default 1.25)")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch dir")
+    args = parser.parse_args()
+    suites = args.only.split(",") if args.only else list(SUITES)
+
+    work = tempfile.mkdtemp(prefix="redrose-bench-")
+    results = {"schema": 1, "started_at": time.time(),
+               "python": platform.python_version(), "machine": platform.machine(),
+               "cpus": os.cpu_count(), "results": {}}
+    try:
+        with standin.StandIn() as server:
+            manifest_path = os.path.join(work, "packages.json")
+            with open(manifest_path, "w", encoding="utf-8") as f:
+                json.dump(manifest(server.url), f, indent=1)
+            # Must be set before the first import of the redrose modules
+            os.environ.update(REDROSE_CACHE_DIR=os.path.join(work, "cache"),
+                              REDROSE_STATE_DIR=os.path.join(work, "state"),
+                              REDROSE_PACKAGES=manifest_path,
+                              REDROSE_GITHUB_API=f"{server.url}/github")
+            sys.path.insert(0, SRC)
+            import main as redrose
+            redrose._log_stream = None
+            redrose.CHECK_DEADLINE = 10
+
+            for suite in suites:
+                started = time.perf_counter()
+                if suite == "checker":
+                    value = bench_checker(redrose, server, work)
+                elif suite == "parsers":
+                    value = bench_parsers(redrose, server, work)
+                elif suite == "startup":
+                    value = bench_startup(args.runs)
+                elif suite == "builds":
+                    value = bench_builds(work)
+                else:
+                    parser.error(f"unknown suite {suite}")
+                value["suite_s"] = round(time.perf_counter() - started, 3)
+                results["results"][suite] = value
+                if not args.json:
+                    print(f"== {suite} ({value['suite_s']}s)")
+                    print(json.dumps(value, indent=1))
+    finally:
+        if args.keep:
+            print(f"scratch dir kept: {work}", file=sys.stderr)
+        else:
+            shutil.rmtree(work, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    status = 0
+    wrong = check(results)
+    for line in wrong:
+        print(f"WRONG {line}", file=sys.stderr)
+    if wrong:
+        status = 1
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            status = 1
+        else:
+            print(f"No regressions against {args.compare}", file=sys.stderr)
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Local HTTP stand-in for the upstreams redrose-maintain talks to.
+
+Serves the recorded pages in bench/fixtures, each in four variants picked
+by the first path component (or, for the GitHub API, the repo owner):
+
+  normal  the recorded page as-is
+  large   the same kind of page padded to several MB
+  slow    the recorded page, trickled out in small delayed chunks
+  fail    503 every time (exercises retries and the check deadline)
+
+Routes:
+  /<variant>/PKGBUILD                        Arch bash PKGBUILD
+  /<variant>/curl/download/                  curl.se download index
+  /github/repos/<owner>/<repo>/tags          GitHub tags API (per_page/page,
+                                             Link and ETag like the real one)
+  /src/                                      index of the synthetic package
+  /src/bench-<version>.tar.gz                tiny synthetic autotools tarball
+
+Every response carries an ETag and honours If-None-Match. Request counts
+per route are kept in StandIn.requests.
+
+Usage: python3 bench/standin.py [--port PORT]   (serve until interrupted)
+"""
+import argparse
+import collections
+import hashlib
+import io
+import json
+import os
+import re
+import tarfile
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+VARIANTS = ("normal", "large", "slow", "fail")
+SLOW_CHUNK = 2048
+SLOW_DELAY = 0.05
+LARGE_TAGS = 20000
+LARGE_CURL_VERSIONS = 2500
+BENCH_SOURCES = 40
+
+def _fixture(name):
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+def large_tags():
+    """A synthetic tag list the size of a big monorepo's."""
+    tags = []
+    for i in range(LARGE_TAGS):
+        name = f"v{i // 400}.{(i // 20) % 20}.{i % 20}" + ("-rc1" if i % 7 == 0 else "")
+        sha = hashlib.sha1(name.encode()).hexdigest()
+        tags.append({"name": name, "commit": {"sha": sha, "url": f"https://example/commits/{sha}"},
+                     "zipball_url": f"https://example/zipball/{name}",
+                     "tarball_url": f"https://example/tarball/{name}"})
+    return tags
+
+def large_curl_page():
+    rows = [f'<tr><td><a href="curl-{i // 100}.{i // 10 % 10}.{i % 10}.tar.gz">'
+            f'curl-{i // 100}.{i // 10 % 10}.{i % 10}.tar.gz</a></td><td>4.1M</td></tr>'
+            for i in range(LARGE_CURL_VERSIONS)]
+    return _fixture("curl-download.html").replace(b"</table>", "\n".join(rows).encode() + b"\n</table>")
+
+def large_pkgbuild():
+    # The version line stays near the top; an early-exiting reader never sees the padding
+    filler = "".join(f"# changelog entry {i}: rebuilt against the new toolchain\n" for i in range(60000))
+    return _fixture("PKGBUILD") + filler.encode()
+
+def bench_tarball(version):
+    """
+    bench-<version>.tar.gz: a configure script (out-of-tree capable), a
+    Makefile.in and BENCH_SOURCES C files linked into src/benchprog. Only
+    src/f0.c depends on the version, so an incremental rebuild between
+    versions recompiles one file.
+    """
+    top = f"bench-{version}"
+    configure = f"""#!/bin/sh
+srcdir=$(cd "$(dirname "$0")" && pwd)
+CC=${{CC:-cc}}
+echo "checking for a C compiler... $CC"
+for h in stdio.h stdlib.h string.h unistd.h; do echo "checking for $h... yes"; done
+mkdir -p src
+objs=""
+for i in $(seq 0 {BENCH_SOURCES - 1}); do objs="$objs src/f$i.o"; done
+sed -e "s|@CC@|$CC|" -e "s|@srcdir@|$srcdir|" -e "s|@OBJS@|$objs|" "$srcdir/Makefile.in" > Makefile
+echo "config.status: creating Makefile"
+"""
+    makefile = """CC = @CC@
+srcdir = @srcdir@
+OBJS = @OBJS@ src/main.o
+
+all: src/benchprog
+
+src/benchprog: $(OBJS)
+\t$(CC) -o $@ $(OBJS)
+
+src/%.o: $(srcdir)/src/%.c
+\t@mkdir -p src
+\t$(CC) -O1 -c -o $@ $<
+"""
+    files = {"configure": (configure, 0o755), "Makefile.in": (makefile, 0o644)}
+    calls = []
+    for i in range(BENCH_SOURCES):
+        extra = f'const char *bench_version = "{version}";\n' if i == 0 else ""
+        files[f"src/f{i}.c"] = (extra + f"int f{i}(int x) {{ int s = 0; for (int k = 0; k < x; k++) "
+                                f"s += k * {i + 1}; return s; }}\n", 0o644)
+        calls.append(f"f{i}(argc)")
+    files["src/main.c"] = ("#include <stdio.h>\n"
+                           + "".join(f"int f{i}(int);\n" for i in range(BENCH_SOURCES))
+                           + "extern const char *bench_version;\n"
+                           + "int main(int argc, char **argv) { (void)argv; printf(\"%s %d\\n\", "
+                           + f"bench_version, {' + '.join(calls)}); return 0; }}\n", 0o644)
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz", compresslevel=6) as tar:
+        for name, (content, mode) in files.items():
+            data = content.encode()
+            info = tarfile.TarInfo(f"{top}/{name}")
+            info.size = len(data)
+            info.mode = mode
+            info.mtime = 1700000000
+            tar.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+class StandIn:
+    """The stand-in server, run on a background thread; use as a context manager."""
+    def __init__(self, port=0):
+        self.requests = collections.Counter()
+        self._pages = {}
+        self._lock = threading.Lock()
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                standin._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            def handle_error(self, request, client_address):
+                pass  # clients hanging up mid-keepalive is routine here
+
+        self.server = Server(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _page(self, key, build):
+        with self._lock:
+            if key not in self._pages:
+                self._pages[key] = build()
+            return self._pages[key]
+
+    def _route(self, path, query):
+        """Return (variant, body, extra headers) or None for 404."""
+        m = re.match(r"^/github/repos/([^/]+)/([^/]+)/tags$", path)
+        if m:
+            variant = m.group(1) if m.group(1) in VARIANTS else "normal"
+            tags = (self._page("large-tags", large_tags) if variant == "large"
+                    else json.loads(_fixture("coreutils-tags.json")))
+            per_page = int(query.get("per_page", ["30"])[0])
+            page = int(query.get("page", ["1"])[0])
+            last = max(1, -(-len(tags) // per_page))
+            body = json.dumps(tags[(page - 1) * per_page:page * per_page]).encode()
+            base = f"{self.url}{path}?per_page={per_page}"
+            links = []
+            if page < last:
+                links.append(f'<{base}&page={page + 1}>; rel="next"')
+                links.append(f'<{base}&page={last}>; rel="last"')
+            return variant, body, {"Link": ", ".join(links)} if links else {}
+        m = re.match(r"^/([a-z]+)/(PKGBUILD|curl/download/)$", path)
+        if m and m.group(1) in VARIANTS:
+            variant, what = m.groups()
+            if what == "PKGBUILD":
+                body = self._page("large-pkgbuild", large_pkgbuild) if variant == "large" \
+                    else _fixture("PKGBUILD")
+            else:
+                body = self._page("large-curl", large_curl_page) if variant == "large" \
+                    else _fixture("curl-download.html")
+            return variant, body, {"Content-Type": "text/plain; charset=utf-8"}
+        if path == "/src/":
+            body = "".join(f'<a href="bench-{v}.tar.gz">bench-{v}.tar.gz</a>\n'
+                           for v in ("1.0", "1.1")).encode()
+            return "normal", body, {}
+        m = re.match(r"^/src/bench-([0-9.]+)\.tar\.gz$", path)
+        if m:
+            return "normal", self._page(path, lambda: bench_tarball(m.group(1))), {}
+        return None
+
+    def _handle(self, req):
+        parts = urllib.parse.urlsplit(req.path)
+        route = self._route(parts.path, urllib.parse.parse_qs(parts.query))
+        with self._lock:
+            self.requests[parts.path] += 1
+        if route is None:
+            req.send_response(404)
+            req.send_header("Content-Length", "0")
+            req.end_headers()
+            return
+        variant, body, headers = route
+        if variant == "fail":
+            req.send_response(503)
+            req.send_header("Content-Length", "0")
+            req.end_headers()
+            return
+        etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+        if req.headers.get("If-None-Match") == etag:
+            with self._lock:
+                self.requests["304"] += 1
+            req.send_response(304)
+            req.send_header("ETag", etag)
+            req.send_header("Content-Length", "0")
+            req.end_headers()
+            return
+        req.send_response(200)
+        req.send_header("ETag", etag)
+        req.send_header("Content-Length", str(len(body)))
+        for k, v in headers.items():
+            req.send_header(k, v)
+        req.end_headers()
+        try:
+            if variant == "slow":
+                for i in range(0, len(body), SLOW_CHUNK):
+                    req.wfile.write(body[i:i + SLOW_CHUNK])
+                    req.wfile.flush()
+                    time.sleep(SLOW_DELAY)
+            else:
+                req.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client stopped reading early, as the fetchers do
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    with StandIn(args.port) as standin:
+        print(f"Serving on {standin.url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for redrose-maintain.
+
+Times fresh interpreter processes for:
+  baseline  - python itself (`-c pass`)
+  check     - importing main.py, i.e. what a headless `--check` run pays
+              before it parses its arguments and sends its first request
+  eager     - the same plus the modules main.py used to import at load
+              time (tkinter, requests, packaging or the distutils fallback),
+              i.e. what every run paid before imports were deferred; skipped
+              (and reported as such) where tkinter is not installed
+
+Usage: python3 bench/startup.py [-n RUNS] [--json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+CASES = {
+    "baseline": "pass",
+    "check": "import sys; sys.path.insert(0, %r); import main" % SRC,
+    "eager": ("import sys; sys.path.insert(0, %r); import main; main._import_tk(); "
+              "main._optional_import('requests')\n"
+              "try:\n    from packaging import version\n"
+              "except Exception:\n"
+              "    try:\n        from distutils.version import LooseVersion\n"
+              "    except Exception:\n        pass" % SRC),
+}
+
+class CaseUnavailable(Exception):
+    pass
+
+def time_case(code, runs):
+    """
+    Wall times of runs fresh interpreters running code. Raises
+    CaseUnavailable if code fails (e.g. the eager case without tkinter).
+    """
+    # One untimed run first so bytecode caches are warm
+    warm = subprocess.run([sys.executable, "-c", code], stdout=subprocess.DEVNULL,
+                          stderr=subprocess.PIPE, text=True, errors="replace")
+    if warm.returncode != 0:
+        lines = warm.stderr.strip().splitlines()
+        raise CaseUnavailable(lines[-1] if lines else f"exit status {warm.returncode}")
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+def measure(runs):
+    """{case: {"median_ms", "min_ms"}, or {"skipped": why} for a case that cannot run here}."""
+    results = {}
+    for name, code in CASES.items():
+        try:
+            samples = time_case(code, runs)
+        except CaseUnavailable as e:
+            results[name] = {"skipped": str(e)}
+            continue
+        results[name] = {"median_ms": round(statistics.median(samples) * 1000, 2),
+                         "min_ms": round(min(samples) * 1000, 2)}
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-n", "--runs", type=int, default=15)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    results = measure(args.runs)
+
+    base = results["baseline"]["median_ms"]
+    for name in ("check", "eager"):
+        if "median_ms" in results[name]:
+            results[name]["over_baseline_ms"] = round(results[name]["median_ms"] - base, 2)
+    eager_cost = results["eager"].get("over_baseline_ms", 0)
+    if eager_cost > 0:
+        results["check"]["fraction_of_eager"] = round(
+            results["check"]["over_baseline_ms"] / eager_cost, 3)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, r in results.items():
+        if "skipped" in r:
+            print(f"{name:<10} skipped: {r['skipped']}")
+            continue
+        extra = f"  (+{r['over_baseline_ms']} ms over python)" if "over_baseline_ms" in r else ""
+        print(f"{name:<10} median {r['median_ms']:>8} ms  min {r['min_ms']:>8} ms{extra}")
+    if "fraction_of_eager" in results["check"]:
+        print(f"check-only start costs {results['check']['fraction_of_eager']:.0%} "
+              f"of the eager-import start")
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,51 @@
 #!/bin/bash
 
-sudo mv src/main.py /usr/bin/redrose-maintain
+# All modules live in a library dir. main.py is started through a small stub,
+# so its bytecode is cached instead of recompiled on every launch; the
+# builders are symlinked, and import their shared helpers from the same dir.
+LIBDIR=/usr/lib/redrose-maintain
+sudo mkdir -p "$LIBDIR"
+sudo mv src/*.py src/*.json "$LIBDIR/"
+sudo python3 -m compileall -q "$LIBDIR"
+sudo tee /usr/bin/redrose-maintain > /dev/null <<EOF
+#!/usr/bin/env python3
+import sys
+sys.path.insert(0, "$LIBDIR")
+import main
+sys.exit(main.main())
+EOF
 sudo chmod +x /usr/bin/redrose-maintain
-sudo mv src/coreutils.py /usr/bin/coreutils
-sudo chmod +x /usr/bin/coreutils
-sudo mv src/bash.py /usr/bin/build-bash
-sudo chmod +x /usr/bin/build-bash
-sudo mv src/curl.py /usr/bin/build-curl
-sudo chmod +x /usr/bin/build-curl
+sudo chmod +x "$LIBDIR/coreutils.py" "$LIBDIR/bash.py" "$LIBDIR/curl.py"
+sudo ln -sf "$LIBDIR/coreutils.py" /usr/bin/coreutils
+sudo ln -sf "$LIBDIR/bash.py" /usr/bin/build-bash
+sudo ln -sf "$LIBDIR/curl.py" /usr/bin/build-curl
+
+read -r -p "Keep upstream versions checked in the background (systemd user service)? [y/N] " response
+case "$response" in
+    [yY][eE][sS]|[yY])
+        UNIT_DIR="$HOME/.config/systemd/user"
+        mkdir -p "$UNIT_DIR"
+        cat > "$UNIT_DIR/redrose-maintain-watch.service" <<EOF
+[Unit]
+Description=RedRose upstream version watcher
+
+[Service]
+ExecStart=/usr/bin/redrose-maintain --watch
+Restart=on-failure
+Nice=10
+
+[Install]
+WantedBy=default.target
+EOF
+        systemctl --user daemon-reload
+        systemctl --user enable --now redrose-maintain-watch.service
+        echo "Version watcher enabled"
+        ;;
+
+    *)
+        echo "Skipping the version watcher."
+        ;;
+esac
 
 read -r -p "Make desktop shortcuts for the commands? [y/N] " response
 case "$response" in
@@ -0,0 +1,179 @@
+"""
+Content-addressed store for build outputs.
+
+Every file a build produces (its binaries and archive) is stored once under
+artifacts/objects/<sha[:2]>/<sha>.<mode>, and each package version gets a
+manifest in artifacts/manifests/<package>/<version>.json naming its files.
+After ingest the files in the output dir are hardlinks to the stored
+objects, so binaries that did not change between releases take no extra
+space anywhere. Objects are read-only; nothing may write through the links.
+
+materialise() recreates a version's bin folder and archive from the store,
+and gc() applies the retention policy (the newest ARTIFACT_KEEP versions
+per package, plus anything younger than ARTIFACT_MAX_AGE_DAYS) and then
+deletes objects no manifest references.
+"""
+import contextlib
+import os
+import shutil
+import stat
+import time
+
+import fsutil
+from paths import CACHE_DIR
+
+ARTIFACT_DIR = os.path.join(CACHE_DIR, "artifacts")
+ARTIFACT_KEEP = int(os.environ.get("REDROSE_ARTIFACT_KEEP", 3))
+ARTIFACT_MAX_AGE_DAYS = float(os.environ.get("REDROSE_ARTIFACT_MAX_AGE_DAYS", 30))
+# Temporary name of the link that replaces an output during ingest
+LINK_SUFFIX = ".redrose-link"
+
+def _objects_dir():
+    return os.path.join(ARTIFACT_DIR, "objects")
+
+def _manifest_path(package, version):
+    return os.path.join(ARTIFACT_DIR, "manifests", package, f"{version}.json")
+
+def _object_path(digest, mode):
+    return os.path.join(_objects_dir(), digest[:2], f"{digest}.{mode:o}")
+
+def _readonly(mode):
+    return stat.S_IMODE(mode) & ~0o222
+
+def _add_object(path):
+    """Store path's content (if new) and swap path for a link to the object."""
+    mode = _readonly(os.stat(path).st_mode)
+    digest = fsutil.sha256_file(path)
+    obj = _object_path(digest, mode)
+    new = not os.path.exists(obj)
+    if new:
+        os.makedirs(os.path.dirname(obj), exist_ok=True)
+        tmp = os.path.join(os.path.dirname(obj), f".tmp-{os.getpid()}-{digest[:12]}")
+        shutil.copy2(path, tmp)
+        os.chmod(tmp, mode)
+        os.replace(tmp, obj)
+    # A restored output may already be a link to obj, and renaming one link
+    # over another to the same inode does nothing (the temp link would stay)
+    if not os.path.samefile(path, obj):
+        link_tmp = path + LINK_SUFFIX
+        try:
+            os.link(obj, link_tmp)
+            os.replace(link_tmp, path)
+        except OSError:
+            pass  # different filesystem: the output keeps its own copy
+        finally:
+            with contextlib.suppress(OSError):
+                os.remove(link_tmp)
+    return {"sha256": digest, "mode": mode, "size": os.path.getsize(obj)}, new
+
+def ingest(package, version, bin_folder, archive=None, log=print):
+    """Add a build's outputs to the store and write its manifest; return the manifest."""
+    files = {}
+    new_files = new_bytes = 0
+    # Ingest and gc hold the whole store; they must not interleave
+    with fsutil.locked(ARTIFACT_DIR):
+        for name in sorted(os.listdir(bin_folder)):
+            path = os.path.join(bin_folder, name)
+            if name.endswith(LINK_SUFFIX):
+                continue  # left behind by an interrupted ingest
+            if os.path.isfile(path) and not os.path.islink(path):
+                files[f"bin/{name}"], new = _add_object(path)
+                new_files += new
+                new_bytes += files[f"bin/{name}"]["size"] if new else 0
+        if archive:
+            files[os.path.basename(archive)], new = _add_object(archive)
+            new_files += new
+            new_bytes += files[os.path.basename(archive)]["size"] if new else 0
+        manifest = {"package": package, "version": version, "created_at": time.time(),
+                    "bin_folder": os.path.basename(bin_folder), "files": files}
+        fsutil.write_json(_manifest_path(package, version), manifest)
+    log(f"[STORE] {package} {version}: {len(files)} files, {new_files} new "
+        f"({new_bytes / 1024 ** 2:.1f} MiB added)")
+    return manifest
+
+def manifests(package=None):
+    """All stored manifests (of one package, if given), newest first."""
+    base = os.path.join(ARTIFACT_DIR, "manifests")
+    found = []
+    for pkg in sorted(os.listdir(base)) if os.path.isdir(base) else []:
+        if package and pkg != package:
+            continue
+        for name in os.listdir(os.path.join(base, pkg)):
+            if name.endswith(".json"):
+                manifest = fsutil.read_json(os.path.join(base, pkg, name))
+                if manifest:
+                    found.append(manifest)
+    return sorted(found, key=lambda m: m["created_at"], reverse=True)
+
+def place(sources, bin_folder_name, out_dir):
+    """
+    Recreate a build's outputs in out_dir from sources, {manifest name
+    ("bin/<file>" or the archive's name): path to take it from}, by
+    hardlink where possible; return (bin_folder, archive). Also used by
+    buildcache.restore.
+    """
+    bin_folder = os.path.join(out_dir, bin_folder_name)
+    if os.path.isdir(bin_folder):
+        shutil.rmtree(bin_folder)
+    os.makedirs(bin_folder)
+    archive = None
+    for rel, src in sources.items():
+        if rel.startswith("bin/"):
+            dst = os.path.join(bin_folder, rel[len("bin/"):])
+        else:
+            dst = archive = os.path.join(out_dir, rel)
+            if os.path.exists(dst):
+                os.remove(dst)
+        fsutil.link_or_copy(src, dst)
+    return bin_folder, archive
+
+def materialise(package, version, out_dir="."):
+    """
+    Recreate package version's bin folder and archive in out_dir from the
+    store (hardlinks where possible); return (bin_folder, archive).
+    """
+    manifest = fsutil.read_json(_manifest_path(package, version))
+    if manifest is None:
+        raise KeyError(f"{package} {version} is not in the artifact store")
+    return place({rel: _object_path(entry["sha256"], entry["mode"])
+                  for rel, entry in manifest["files"].items()},
+                 manifest["bin_folder"], out_dir)
+
+def gc(keep=None, max_age_days=None, log=print):
+    """
+    Drop manifests outside the retention policy, then every object no
+    remaining manifest references. Returns the number of bytes freed.
+    """
+    keep = ARTIFACT_KEEP if keep is None else keep
+    max_age_days = ARTIFACT_MAX_AGE_DAYS if max_age_days is None else max_age_days
+    cutoff = time.time() - max_age_days * 86400
+    freed = 0
+    with fsutil.locked(ARTIFACT_DIR):
+        by_package = {}
+        for manifest in manifests():
+            by_package.setdefault(manifest["package"], []).append(manifest)
+        live = set()
+        for package, items in by_package.items():
+            for i, manifest in enumerate(items):
+                if i < keep or manifest["created_at"] >= cutoff:
+                    live.update(_object_path(e["sha256"], e["mode"])
+                                for e in manifest["files"].values())
+                    continue
+                os.remove(_manifest_path(package, manifest["version"]))
+                log(f"[STORE] Dropped {package} {manifest['version']}")
+        for root, _, names in os.walk(_objects_dir()):
+            for name in names:
+                path = os.path.join(root, name)
+                if path not in live:
+                    freed += os.path.getsize(path)
+                    os.remove(path)
+    log(f"[STORE] gc freed {freed / 1024 ** 2:.1f} MiB")
+    return freed
+
+def usage():
+    """(bytes stored, bytes the manifests describe): the second over the first is the dedup ratio."""
+    stored = 0
+    for root, _, names in os.walk(_objects_dir()):
+        stored += sum(os.path.getsize(os.path.join(root, n)) for n in names)
+    logical = sum(e["size"] for m in manifests() for e in m["files"].values())
+    return stored, logical
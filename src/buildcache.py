@@ -0,0 +1,135 @@
+"""
+Cache of finished build artifacts.
+
+An entry is keyed by package, version, configure flags and toolchain
+(compiler version + host arch) and holds the bin folder, the archive and a
+manifest.json with the SHA-256 of every file. Identical builds are then
+restored from the cache instead of being run again.
+
+Lookups search the local cache (CACHE_DIR/builds) first, then any read-only
+caches listed in REDROSE_BUILD_CACHE_RO (colon-separated, e.g. an NFS
+export of another host's cache). Entries are verified against their
+manifest before use, and the local cache is trimmed LRU to
+BUILD_CACHE_MAX_BYTES.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import artstore
+import fsutil
+import incremental
+from paths import CACHE_DIR
+
+BUILD_CACHE_DIR = os.path.join(CACHE_DIR, "builds")
+BUILD_CACHE_MAX_BYTES = int(os.environ.get("REDROSE_BUILD_CACHE_MAX", 5 * 1024 ** 3))
+MANIFEST = "manifest.json"
+
+def readonly_dirs():
+    return [d for d in os.environ.get("REDROSE_BUILD_CACHE_RO", "").split(":") if d]
+
+def build_key(package, version, configure_args, **options):
+    """
+    Return (key, fields) identifying a build's inputs; options are any other
+    settings that change the artifact (archive format, stripping).
+    """
+    fields = dict(options, package=package, version=version,
+                  configure_args=list(configure_args),
+                  toolchain=incremental.toolchain_id())
+    key = hashlib.sha256(json.dumps(fields, sort_keys=True).encode("utf-8")).hexdigest()
+    return key, fields
+
+def _read_manifest(entry_dir):
+    return fsutil.read_json(os.path.join(entry_dir, MANIFEST))
+
+def verify(entry_dir, manifest=None):
+    """True if every file listed in the entry's manifest is present and intact."""
+    manifest = manifest or _read_manifest(entry_dir)
+    if not manifest:
+        return False
+    for rel, digest in manifest["files"].items():
+        path = os.path.join(entry_dir, rel)
+        if not os.path.isfile(path) or fsutil.sha256_file(path) != digest:
+            return False
+    return True
+
+def lookup(key, log=print):
+    """Return the directory of a verified cache entry for key, or None."""
+    for base in [BUILD_CACHE_DIR] + readonly_dirs():
+        entry_dir = os.path.join(base, key)
+        manifest = _read_manifest(entry_dir)
+        if not manifest:
+            continue
+        if not verify(entry_dir, manifest):
+            log(f"[CACHE] Build cache entry {key[:12]} in {base} failed verification")
+            if base == BUILD_CACHE_DIR:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+            continue
+        if base == BUILD_CACHE_DIR:
+            manifest["used_at"] = time.time()
+            _write_manifest(entry_dir, manifest)
+        return entry_dir
+    return None
+
+def _write_manifest(entry_dir, manifest):
+    fsutil.write_json(os.path.join(entry_dir, MANIFEST), manifest)
+
+def restore(entry_dir, out_dir):
+    """
+    Materialise a cache entry in out_dir (hardlinks where possible) and
+    return (bin_folder, archive).
+    """
+    manifest = _read_manifest(entry_dir)
+    return artstore.place({rel: os.path.join(entry_dir, rel) for rel in manifest["files"]},
+                          manifest["bin_folder"], out_dir)
+
+def store(key, fields, bin_folder, archive, log=print):
+    """Add a finished build to the local cache (atomically) and evict old entries."""
+    entry_dir = os.path.join(BUILD_CACHE_DIR, key)
+    if os.path.isdir(entry_dir):
+        return entry_dir
+    os.makedirs(BUILD_CACHE_DIR, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=BUILD_CACHE_DIR)
+    files = {}
+    os.makedirs(os.path.join(tmp_dir, "bin"))
+    for name in sorted(os.listdir(bin_folder)):
+        src = os.path.join(bin_folder, name)
+        if os.path.isfile(src):
+            fsutil.link_or_copy(src, os.path.join(tmp_dir, "bin", name))
+            files[f"bin/{name}"] = fsutil.sha256_file(src)
+    if archive:
+        fsutil.link_or_copy(archive, os.path.join(tmp_dir, os.path.basename(archive)))
+        files[os.path.basename(archive)] = fsutil.sha256_file(archive)
+    size = sum(os.path.getsize(os.path.join(tmp_dir, rel)) for rel in files)
+    now = time.time()
+    manifest = dict(fields, key=key, files=files, size=size, created_at=now, used_at=now,
+                    bin_folder=os.path.basename(bin_folder))
+    _write_manifest(tmp_dir, manifest)
+    try:
+        os.rename(tmp_dir, entry_dir)
+    except OSError:
+        # Another build stored the same key first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        return entry_dir
+    log(f"[CACHE] Stored build {fields['package']} {fields['version']} as {key[:12]}")
+    evict(log=log)
+    return entry_dir
+
+def evict(max_bytes=None, log=print):
+    """Remove least recently used local entries until the cache fits max_bytes."""
+    max_bytes = BUILD_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    entries = []
+    for key in os.listdir(BUILD_CACHE_DIR):
+        manifest = _read_manifest(os.path.join(BUILD_CACHE_DIR, key))
+        if manifest:
+            entries.append((manifest.get("used_at", 0), key, manifest.get("size", 0)))
+    total = sum(e[2] for e in entries)
+    for _, key, size in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(os.path.join(BUILD_CACHE_DIR, key), ignore_errors=True)
+        total -= size
+        log(f"[CACHE] Evicted build {key[:12]}")
@@ -0,0 +1,638 @@
+"""
+In-process build engine for the RedRose base packages.
+
+Each package is described by a Recipe. A Build walks one package through
+fetch -> configure -> compile -> package, and a BuildScheduler runs several
+builds at once, splitting one global make job budget between the builds
+that are compiling. Fetching and configuring cost few or no job slots, so
+one build's download/configure overlaps another's compile.
+
+With incremental=True a build reuses the package's persistent work dir
+(see incremental.py): out-of-tree, with a cached configure that is skipped
+when nothing relevant changed.
+
+Unless use_cache=False, a build whose inputs (package, version, flags,
+toolchain) match a verified buildcache entry is restored from it instead.
+
+A clean build compiles in a scratch workspace, on tmpfs when there is
+room (see workspace.py), and writes only its outputs to out_dir. The
+workspace is removed after a successful build and kept (on disk) after a
+failure past the fetch; a build that fills the tmpfs is retried once on disk.
+
+Finished outputs are then deduplicated into the artifact store
+(artstore.py), leaving hardlinks in the output dir.
+
+Every phase change is reported to on_status(status) with a plain dict
+(see Build.status), so the GUI can track and coordinate builds; measured
+progress within a phase (see progress.py) is reported at most every
+PROGRESS_INTERVAL seconds. The last runner.TAIL_LINES lines of command
+output are kept in Build.tail for error reports.
+
+Commands run at low CPU and I/O priority, and while builds run a
+governor (see governor.py) restarts the biggest make with fewer jobs when
+memory runs low, and pauses builds when the load gets too high; a paused
+build's job slots go to the others until it resumes.
+
+Each finished build (done or failed) is appended to the telemetry history
+with per-phase wall time, CPU time and peak RSS (see telemetry.py).
+"""
+import collections
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import artstore
+import buildcache
+import fsutil
+import governor
+import incremental as incr
+import jobs
+import pack
+import progress
+import registry
+import runner
+import srccache
+import telemetry
+import workspace
+
+# Seconds between progress reports within a phase
+PROGRESS_INTERVAL = 0.25
+
+class BuildError(Exception):
+    pass
+
+class Recipe:
+    """
+    How to build one package: where its tarball lives, how to configure it
+    and which executables make up its binary artifact (either the named
+    files in the tree root, or every executable in bin_dir).
+    """
+    def __init__(self, name, url, sig_suffix=".sig", configure_args=(),
+                 bin_dir=None, binaries=()):
+        self.name = name
+        self.url = url
+        self.sig_suffix = sig_suffix
+        self.configure_args = list(configure_args)
+        self.bin_dir = bin_dir
+        self.binaries = tuple(binaries)
+
+    def source_url(self, version):
+        return self.url.format(version=version)
+
+    def collect(self, tree):
+        """Return the paths of the executables to ship from a built tree."""
+        if self.bin_dir:
+            src_dir = os.path.join(tree, self.bin_dir)
+            names = sorted(os.listdir(src_dir))
+        else:
+            src_dir = tree
+            names = self.binaries
+        found = []
+        for f in names:
+            full = os.path.join(src_dir, f)
+            if os.path.isfile(full) and os.access(full, os.X_OK):
+                found.append(full)
+        return found
+
+# Build recipes come from the package registry (packages.json)
+RECIPES = {name: Recipe(name, **pkg.recipe) for name, pkg in registry.packages().items()}
+
+class JobBudget:
+    """A pool of make job slots shared by all running builds."""
+    def __init__(self, total):
+        self.total = max(1, total)
+        self._free = self.total
+        self._cond = threading.Condition()
+
+    def acquire(self, want):
+        """Block until at least one slot is free; take up to want of them."""
+        with self._cond:
+            while self._free <= 0:
+                self._cond.wait()
+            granted = max(1, min(want, self._free))
+            self._free -= granted
+            return granted
+
+    def release(self, n):
+        with self._cond:
+            self._free += n
+            self._cond.notify_all()
+
+    def reclaim(self, n):
+        """Take back n slots lent out by release() without waiting (the pool may go negative)."""
+        with self._cond:
+            self._free -= n
+
+class Build:
+    def __init__(self, recipe, version, out_dir, budget, share, log=print, on_status=None,
+                 incremental=False, use_cache=True, archive_format=None, strip=False,
+                 workspace_mode=None, keep_workspace=False, govern=True):
+        self.recipe = recipe
+        self.incremental = incremental
+        self.archive_format = archive_format or pack.default_format()
+        self.strip = strip
+        self.workspace_mode = workspace_mode
+        self.keep_workspace = keep_workspace
+        self.workspace = None  # "ram" or "disk" once a clean build has one
+        self.govern = govern
+        self.pid = None  # of the running command, for the governor
+        self.throttled = None  # why the governor has paused this build, if it has
+        self.tree_rss = 0
+        self.shed_to = None  # jobs to restart make with once the governor stops it
+        self.slots = 0  # job slots held right now
+        self._slots_lent = False  # given back to the budget while paused
+        self._slot_lock = threading.Lock()
+        self.use_cache = use_cache
+        self.cached = False
+        self.version = version
+        self.out_dir = os.path.abspath(out_dir)
+        self.budget = budget
+        self._share = share  # callable: fair job share right now
+        self.log = log
+        self.on_status = on_status
+        self.phase = "queued"
+        self.state = "queued"
+        self.jobs = 0
+        self.error = None
+        self.started = None
+        self.finished = None
+        self.phase_times = {}
+        self.phase_stats = {}
+        self.bytes_downloaded = 0
+        self._phase_cpu = 0.0
+        self._phase_rss = 0
+        self.progress = {}
+        self._progress_lock = threading.Lock()  # both output readers count lines
+        self.tail = collections.deque(maxlen=runner.TAIL_LINES)
+        self._last_report = 0.0
+        self.bin_folder = None
+        self.archive = None
+
+    @property
+    def name(self):
+        return self.recipe.name
+
+    def status(self):
+        end = self.finished or time.monotonic()
+        return {"package": self.name, "version": self.version, "state": self.state,
+                "phase": self.phase, "jobs": self.jobs,
+                "elapsed": round(end - self.started, 1) if self.started else 0.0,
+                "phase_times": dict(self.phase_times), "error": self.error,
+                "artifact": self.archive, "incremental": self.incremental,
+                "cached": self.cached, "workspace": self.workspace,
+                "throttled": self.throttled, "rss": self.tree_rss,
+                "progress": dict(self.progress)}
+
+    def tail_text(self, limit=40):
+        return "\n".join(list(self.tail)[-limit:])
+
+    def _report(self):
+        self._last_report = time.monotonic()
+        if self.on_status:
+            self.on_status(self.status())
+
+    def _report_progress(self):
+        if time.monotonic() - self._last_report >= PROGRESS_INTERVAL:
+            self._report()
+
+    def _enter(self, phase):
+        self.phase = phase
+        if phase in ("configure", "compile"):
+            self.progress = {"done": 0, "unit": "lines",
+                             "total": progress.expected_lines(self.name, phase, self.incremental)}
+        elif phase == "fetch":
+            self.progress = {"done": 0, "total": None, "unit": "bytes", "entries": 0}
+        else:
+            self.progress = {}
+        self.log(f"[BUILD:{self.name}] {phase}")
+        self._report()
+        # CPU time of this thread, plus that of the commands run (added in _run)
+        self._phase_cpu = -time.thread_time()
+        self._phase_rss = 0
+        return time.monotonic()
+
+    def _leave(self, phase, entered):
+        self.phase_times[phase] = round(time.monotonic() - entered, 2)
+        self.phase_stats[phase] = {"wall": self.phase_times[phase],
+                                   "cpu": round(self._phase_cpu + time.thread_time(), 2),
+                                   "peak_rss": self._phase_rss}
+        if phase in ("configure", "compile") and self.progress.get("done"):
+            progress.record_lines(self.name, phase, self.incremental, self.progress["done"])
+
+    def _run(self, cmd, cwd):
+        def on_line(stream, line):
+            self.tail.append(line if stream == "stdout" else f"[stderr] {line}")
+            with self._progress_lock:
+                if "done" in self.progress:
+                    self.progress["done"] += 1
+            self.log(f"[BUILD:{self.name}] {line}" if stream == "stdout"
+                     else f"[BUILD:{self.name}:err] {line}")
+            self._report_progress()
+        def on_start(proc):
+            self.pid = proc.pid
+        try:
+            result = runner.run_streaming(governor.wrap(cmd) if self.govern else cmd,
+                                          on_line=on_line, cwd=cwd, on_start=on_start)
+        finally:
+            self.pid = None
+        self._phase_cpu += result.cpu_time
+        self._phase_rss = max(self._phase_rss, result.max_rss)
+        if result.returncode != 0:
+            raise BuildError(f"{' '.join(cmd)} exited with code {result.returncode}\n"
+                             f"{result.tail_text(limit=20)}")
+
+    def run(self):
+        self.started = time.monotonic()
+        self.state = "running"
+        try:
+            key, fields = buildcache.build_key(self.name, self.version, self.recipe.configure_args,
+                                               archive_format=self.archive_format, strip=self.strip)
+            if self.use_cache and self._restore_cached(key):
+                self._store_artifacts()
+                self.state = "done"
+                self.phase = "done"
+                return
+            if self.incremental:
+                # Other processes building this package incrementally wait
+                with fsutil.locked(os.path.join(incr.WORK_DIR, self.name)):
+                    self._build_incremental()
+            else:
+                self._build_clean()
+            self._store_artifacts()
+            if self.use_cache:
+                buildcache.store(key, fields, self.bin_folder, self.archive, log=self.log)
+            self.state = "done"
+            self.phase = "done"
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            self.log(f"[BUILD:{self.name}] failed in {self.phase}: {e}")
+        finally:
+            self.finished = time.monotonic()
+            self._record_telemetry()
+            self._report()
+
+    def _record_telemetry(self):
+        stats = self.phase_stats.values()
+        try:
+            telemetry.record({
+                "time": time.time(), "package": self.name, "version": self.version,
+                "state": self.state, "failed_phase": self.phase if self.state == "failed" else None,
+                "cached": self.cached, "incremental": self.incremental, "jobs": self.jobs,
+                "budget": self.budget.total, "archive_format": self.archive_format,
+                "strip": self.strip, "workspace": self.workspace, "wall": round(self.finished - self.started, 2),
+                "cpu": round(sum(s["cpu"] for s in stats), 2),
+                "peak_rss": max((s["peak_rss"] for s in stats), default=0),
+                "bytes_downloaded": self.bytes_downloaded, "phases": self.phase_stats,
+                "host": telemetry.host_info()})
+        except OSError as e:
+            self.log(f"[BUILD:{self.name}] could not record telemetry: {e}")
+
+    def _restore_cached(self, key):
+        t = self._enter("cache")
+        entry = buildcache.lookup(key, log=self.log)
+        if entry:
+            self.bin_folder, self.archive = buildcache.restore(entry, self.out_dir)
+            self.cached = True
+            self.log(f"[BUILD:{self.name}] {self.version} restored from build cache ({key[:12]})")
+        self._leave("cache", t)
+        return self.cached
+
+    def _store_artifacts(self):
+        try:
+            artstore.ingest(self.name, self.version, self.bin_folder, self.archive, log=self.log)
+        except OSError as e:
+            # The outputs are complete either way; they just stay undeduplicated
+            self.log(f"[BUILD:{self.name}] could not add outputs to the artifact store: {e}")
+
+    def _fetch(self, dest):
+        def on_progress(done, total, entries, from_cache):
+            self.progress.update(done=done, total=total, entries=entries)
+            if not from_cache:
+                self.bytes_downloaded = done
+            self._report_progress()
+        url = self.recipe.source_url(self.version)
+        return srccache.fetch_and_extract(self.name, self.version, url, dest,
+                                          sig_url=url + self.recipe.sig_suffix, log=self.log,
+                                          progress=on_progress)
+
+    def _take_slots(self, want):
+        granted = self.budget.acquire(want)
+        with self._slot_lock:
+            self.slots = granted
+        return granted
+
+    def _return_slots(self, n=None):
+        """Give back n of the held slots (default: all), unless they are lent out."""
+        with self._slot_lock:
+            n = self.slots if n is None else n
+            if not self._slots_lent:
+                self.budget.release(n)
+            self.slots -= n
+            if not self.slots:
+                self._slots_lent = False
+
+    def lend_slots(self):
+        """While the governor has this build paused, its slots go to the other builds."""
+        with self._slot_lock:
+            if self.slots and not self._slots_lent:
+                self.budget.release(self.slots)
+                self._slots_lent = True
+
+    def reclaim_slots(self):
+        with self._slot_lock:
+            if self._slots_lent:
+                self.budget.reclaim(self.slots)
+                self._slots_lent = False
+
+    def _configure(self, cmd, cwd):
+        self._take_slots(1)
+        try:
+            self._run(cmd, cwd)
+        finally:
+            self._return_slots()
+
+    def _compile(self, cwd):
+        self.jobs = self._take_slots(self._share())
+        try:
+            while True:
+                self.shed_to = None
+                self._report()
+                self.log(f"[BUILD:{self.name}] make -j{self.jobs}")
+                try:
+                    self._run(jobs.make_command(self.jobs), cwd)
+                    return
+                except BuildError:
+                    if not self.shed_to:
+                        raise
+                # The governor stopped make to free memory: go on with fewer
+                # jobs (make keeps what it built)
+                self._return_slots(self.jobs - self.shed_to)
+                self.jobs = self.shed_to
+        finally:
+            self._return_slots()
+
+    def _build_clean(self):
+        """Fresh tree in a scratch workspace, full configure and make."""
+        mode = self.workspace_mode
+        while True:
+            ws = workspace.Workspace(self.name, self.version, mode=mode, log=self.log)
+            self.workspace = ws.kind
+            try:
+                self._build_tree(ws.path)
+            except Exception:
+                if ws.kind == "ram" and ws.full():
+                    ws.spill()
+                    mode = "disk"
+                    continue
+                if self.phase == "fetch":
+                    ws.remove()
+                else:
+                    ws.keep()
+                raise
+            ws.measure()
+            if self.keep_workspace:
+                ws.keep("as asked")
+            else:
+                ws.remove()
+            return
+
+    def _build_tree(self, work):
+        t = self._enter("fetch")
+        tree = self._fetch(work)
+        self._leave("fetch", t)
+
+        t = self._enter("configure")
+        self._configure(["./configure"] + self.recipe.configure_args, tree)
+        self._leave("configure", t)
+
+        t = self._enter("compile")
+        self._compile(tree)
+        self._leave("compile", t)
+
+        t = self._enter("package")
+        self._package(tree)
+        self._leave("package", t)
+
+    def _build_incremental(self):
+        """Sync the release into the persistent tree and rebuild only what changed."""
+        src_dir, build_dir = incr.package_dirs(self.name)
+
+        t = self._enter("fetch")
+        incoming = tempfile.mkdtemp(prefix="incoming-", dir=os.path.dirname(src_dir))
+        try:
+            top = self._fetch(incoming)
+            changed, removed = incr.sync_tree(top, src_dir)
+        finally:
+            shutil.rmtree(incoming, ignore_errors=True)
+        self.log(f"[BUILD:{self.name}] source synced: {changed} changed, {removed} removed")
+        self._leave("fetch", t)
+
+        t = self._enter("configure")
+        url = self.recipe.source_url(self.version)
+        stamp = incr.configure_stamp(self.recipe.configure_args,
+                                     srccache.cached_sha256(self.name, self.version, url))
+        if incr.configure_needed(build_dir, stamp):
+            incr.clear_stamp(build_dir)
+            self._configure([os.path.join(src_dir, "configure"),
+                             f"--cache-file={incr.config_cache_path(self.name)}"]
+                            + self.recipe.configure_args, build_dir)
+            incr.write_stamp(build_dir, stamp)
+        else:
+            self.log(f"[BUILD:{self.name}] configure skipped (flags, toolchain and source unchanged)")
+        self._leave("configure", t)
+
+        t = self._enter("compile")
+        self._compile(build_dir)
+        self._leave("compile", t)
+
+        t = self._enter("package")
+        self._package(build_dir)
+        self._leave("package", t)
+
+    def _package(self, tree):
+        base = f"{self.name}-{self.version}-bin"
+        self.bin_folder = os.path.join(self.out_dir, base)
+        base_name = os.path.join(self.out_dir, base)
+        # Start from scratch: old outputs may be hardlinks into the build cache
+        if os.path.isdir(self.bin_folder):
+            shutil.rmtree(self.bin_folder)
+        if os.path.exists(pack.archive_path(base_name, self.archive_format)):
+            os.remove(pack.archive_path(base_name, self.archive_format))
+        os.makedirs(self.bin_folder)
+        try:
+            pack.stage(self.recipe.collect(tree), self.bin_folder,
+                       share=not (self.strip or self.incremental))
+            if self.strip:
+                pack.strip_binaries(self.bin_folder, log=self.log)
+            self.archive = pack.make_archive(self.bin_folder, base_name, self.archive_format)
+        except BaseException:
+            # Leave no half-staged outputs in out_dir
+            shutil.rmtree(self.bin_folder, ignore_errors=True)
+            try:
+                os.remove(pack.archive_path(base_name, self.archive_format))
+            except OSError:
+                pass
+            self.bin_folder = None
+            raise
+        self.log(f"[BUILD:{self.name}] Binaries saved to: {self.bin_folder}")
+        self.log(f"[BUILD:{self.name}] Archive created: {self.archive}")
+
+class BuildScheduler:
+    """
+    Runs builds concurrently under one job budget (default: jobs.make_jobs()).
+    A compiling build asks for an equal share of the budget among the
+    builds that are still unfinished. One scheduler may live on (as the
+    GUI's does), so builds submitted later share the same budget and
+    governor as those already running; finished builds are forgotten
+    when the next one is submitted.
+    """
+    def __init__(self, total_jobs=None, out_dir=".", log=print, on_status=None,
+                 incremental=False, use_cache=True, archive_format=None, strip=False,
+                 workspace_mode=None, keep_workspace=False, govern=True):
+        if not total_jobs:
+            total_jobs, reason = jobs.make_jobs()
+            log(f"[BUILD] Job budget: {total_jobs} ({reason})")
+        self.budget = JobBudget(total_jobs)
+        self.out_dir = out_dir
+        self.log = log
+        self.on_status = on_status
+        self.incremental = incremental
+        self.use_cache = use_cache
+        self.archive_format = archive_format
+        self.strip = strip
+        self.workspace_mode = workspace_mode
+        self.keep_workspace = keep_workspace
+        self.govern = govern
+        self.governor = governor.Governor(lambda: list(self.builds), log=log) if govern else None
+        self.builds = []
+        self._threads = {}  # build -> thread running it
+        self._lock = threading.Lock()
+
+    def _fair_share(self):
+        with self._lock:
+            active = sum(1 for b in self.builds if b.state in ("queued", "running"))
+        return max(1, self.budget.total // max(1, active))
+
+    def _active(self):
+        return any(b.state in ("queued", "running") for b in self.builds)
+
+    def _prune(self):
+        """Forget builds whose threads have ended (the caller holds self._lock)."""
+        for build in [b for b, t in self._threads.items() if not t.is_alive()]:
+            self.builds.remove(build)
+            del self._threads[build]
+
+    def submit(self, name, version, incremental=None):
+        """Start building name at version; incremental defaults to the scheduler's setting."""
+        recipe = RECIPES.get(name)
+        if recipe is None:
+            raise BuildError(f"no recipe for {name}")
+        build = Build(recipe, version, self.out_dir, self.budget, self._fair_share,
+                      log=self.log, on_status=self.on_status,
+                      incremental=self.incremental if incremental is None else incremental,
+                      use_cache=self.use_cache, archive_format=self.archive_format,
+                      strip=self.strip, workspace_mode=self.workspace_mode,
+                      keep_workspace=self.keep_workspace, govern=self.govern)
+        with self._lock:
+            if any(b.name == name and b.state in ("queued", "running") for b in self.builds):
+                raise BuildError(f"{name} is already being built")
+            self._prune()
+            self.builds.append(build)
+            if self.governor:
+                self.governor.start()
+            t = threading.Thread(target=build.run, daemon=True)
+            self._threads[build] = t
+        build._report()
+        t.start()
+        return build
+
+    def wait(self, builds=None):
+        """Wait for builds (default: every build not yet forgotten) and return them."""
+        with self._lock:
+            builds = list(self.builds) if builds is None else list(builds)
+            # A build missing here was pruned, so it has already finished
+            threads = [self._threads[b] for b in builds if b in self._threads]
+        try:
+            for t in threads:
+                t.join()
+        finally:
+            with self._lock:
+                if self.governor and not self._active():
+                    self.governor.stop()
+        return builds
+
+    def run(self, targets):
+        """Build every (name, version) in targets at once; return the Builds."""
+        started = time.monotonic()
+        builds = self.wait([self.submit(name, version) for name, version in targets])
+        self.log(f"[BUILD] {len(builds)} build(s) finished in {time.monotonic() - started:.1f}s")
+        return builds
+
+def cli(package, quiet=False, pause=False, argv=None):
+    """
+    Command line of the per-package builder scripts: parse argv, build
+    package and report; returns the exit status. quiet shows a progress
+    line instead of the build output by default (-q turns it on otherwise);
+    pause waits for Enter before returning, for launchers that open a
+    terminal just for the build.
+    """
+    import argparse
+    parser = argparse.ArgumentParser(description=f"Build {package} from its upstream release tarball.")
+    parser.add_argument("version", nargs="?", help=f"{package} version to build (asked for if omitted)")
+    parser.add_argument("-j", "--jobs", type=int,
+                        help="parallel make jobs (default: sized from CPUs, load and memory; env REDROSE_JOBS)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="reuse the persistent build tree and cached configure results")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="rebuild even if an identical build is in the build cache")
+    parser.add_argument("--format", choices=pack.ARCHIVE_FORMATS,
+                        help="archive format (default: tar.zst if zstd is installed; env REDROSE_ARCHIVE_FORMAT)")
+    parser.add_argument("--strip", action="store_true", help="strip binaries before packaging")
+    parser.add_argument("--workspace", choices=workspace.MODES,
+                        help="where to compile: tmpfs when it fits (auto), ram or disk "
+                             "(default: auto; env REDROSE_WORKSPACE)")
+    parser.add_argument("--keep-workspace", action="store_true",
+                        help="keep the build tree after a successful build (it is kept when a build fails after fetching)")
+    parser.add_argument("--no-governor", action="store_true",
+                        help="run build commands at normal priority, never paused "
+                             "(default: nice/ionice, fewer make jobs when memory is low, paused under high load)")
+    parser.add_argument("-q", "--quiet", action="store_true", default=quiet,
+                        help="show a progress line instead of the build output (its tail is shown on failure)")
+    args = parser.parse_args(argv)
+
+    status = 1
+    try:
+        version = args.version or input(f"{package} version: ")
+        # Build output stays behind a progress line when quiet; its tail is shown on failure
+        bar = progress.TerminalProgress() if args.quiet else None
+        try:
+            build = BuildScheduler(total_jobs=args.jobs, incremental=args.incremental,
+                                   use_cache=not args.no_cache,
+                                   archive_format=args.format, strip=args.strip,
+                                   workspace_mode=args.workspace,
+                                   keep_workspace=args.keep_workspace,
+                                   govern=not args.no_governor,
+                                   log=(lambda msg: None) if args.quiet else print,
+                                   on_status=bar).run([(package, version)])[0]
+        finally:
+            if bar:
+                bar.finish()
+        if build.state != "done":
+            if args.quiet:
+                print(f"Build failed in {build.phase}: {build.error.splitlines()[0]}")
+                print(f"--- last output ---\n{build.tail_text()}")
+        else:
+            print(progress.phase_summary(build))
+            if not build.cached:
+                print(f"make -j{build.jobs} finished in {build.phase_times['compile']:.1f}s")
+            print(f"\nDone! Binaries saved to: {build.bin_folder}")
+            print(f"Archive created: {build.archive}")
+            status = 0
+    except (BuildError, registry.RegistryError, OSError, ValueError) as e:
+        print(f"error: {e}")
+    if pause:
+        input()
+    return status
@@ -0,0 +1,65 @@
+"""File helpers shared by the caches and state files."""
+import contextlib
+import json
+import os
+
+def sha256_file(path, chunk_size=1024 * 1024):
+    import hashlib
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def link_or_copy(src, dst):
+    """Hardlink src to dst, or copy it where a link is not possible (another filesystem)."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        import shutil
+        shutil.copy2(src, dst)
+
+def write_atomic(path, data):
+    """
+    Replace path with data (bytes) atomically. The temporary file is unique
+    per call, so concurrent writers (threads or processes) never share one;
+    the last os.replace wins.
+    """
+    import tempfile
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+@contextlib.contextmanager
+def locked(path):
+    """
+    Hold an exclusive flock on path + ".lock" for a read-modify-write of
+    path. Each call opens its own descriptor, so threads of one process
+    exclude each other as well as other processes.
+    """
+    import fcntl
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+def read_json(path, default=None):
+    """The JSON document at path, or default if it is missing or unreadable."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+def write_json(path, data, indent=1):
+    write_atomic(path, json.dumps(data, indent=indent, sort_keys=True).encode("utf-8"))
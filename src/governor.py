@@ -0,0 +1,211 @@
+"""
+Resource governor for build commands, so the desktop stays responsive.
+
+Every build command runs under nice (REDROSE_NICE, default 10) and ionice
+(REDROSE_IONICE: low = best-effort level 7, the default; idle; or off).
+
+While builds run, a Governor samples each build's process tree (from /proc)
+every INTERVAL seconds, along with the load average and MemAvailable:
+
+  free memory below MIN_FREE_MEM   the compiling build with the largest
+                                   tree RSS sheds jobs: its make is stopped
+                                   (SIGTERM to the tree) and restarted with
+                                   half the jobs, keeping what it built; at
+                                   most once every SHED_INTERVAL seconds
+  load above MAX_LOAD              with several builds running, the newest
+                                   one is paused (SIGSTOP to its whole
+                                   tree) and its job slots go to the other
+                                   builds; a lone build keeps going (nice
+                                   and make -l already hold it back)
+
+A stopped process keeps its memory, so low memory never pauses a build.
+
+One build is paused or resumed per sample. Paused builds resume, oldest
+first, once the load is below RESUME_LOAD_FACTOR * MAX_LOAD (and memory is
+not low), taking their job slots back. A build paused for longer than
+PAUSE_MAX is resumed regardless and left alone for PAUSE_MAX.
+
+Each action is logged, and pauses are reported through the build's status
+("throttled" gives the reason while it is paused; "rss" the tree's RSS).
+"""
+import os
+import shutil
+import signal
+import threading
+import time
+
+import jobs
+
+NICE = int(os.environ.get("REDROSE_NICE", 10))
+IONICE = os.environ.get("REDROSE_IONICE", "low")
+IONICE_ARGS = {"low": ["-c", "2", "-n", "7"], "idle": ["-c", "3"], "off": None}
+INTERVAL = 1.0
+MAX_LOAD = float(os.environ.get("REDROSE_MAX_LOAD") or jobs.cpu_count() * 1.5)
+MIN_FREE_MEM = int(os.environ.get("REDROSE_MIN_FREE_MEM_MB", 1024)) * 1024 ** 2
+RESUME_LOAD_FACTOR = 0.8
+SHED_INTERVAL = 10.0
+PAUSE_MAX = float(os.environ.get("REDROSE_PAUSE_MAX", 300))
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+def wrap(cmd):
+    """cmd prefixed with nice/ionice as configured (tools that are missing are skipped)."""
+    prefix = []
+    if NICE and shutil.which("nice"):
+        prefix += ["nice", "-n", str(NICE)]
+    if IONICE_ARGS.get(IONICE) and shutil.which("ionice"):
+        prefix += ["ionice"] + IONICE_ARGS[IONICE]
+    return prefix + list(cmd)
+
+def _processes():
+    """{pid: (ppid, rss bytes)} for every process in /proc."""
+    procs = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "rb") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name may hold spaces and parens; the fields follow the last ')'
+        fields = stat[stat.rfind(b")") + 2:].split()
+        try:
+            procs[int(entry)] = (int(fields[1]), int(fields[21]) * _PAGE_SIZE)
+        except (IndexError, ValueError):
+            continue
+    return procs
+
+def process_tree(root, procs):
+    """Pids of root and all its descendants in procs."""
+    children = {}
+    for pid, (ppid, _) in procs.items():
+        children.setdefault(ppid, []).append(pid)
+    tree, todo = [], [root]
+    while todo:
+        pid = todo.pop()
+        if pid in procs:
+            tree.append(pid)
+            todo.extend(children.get(pid, ()))
+    return tree
+
+def _signal_all(pids, sig):
+    for pid in pids:
+        try:
+            os.kill(pid, sig)
+        except OSError:
+            pass
+
+def _mib(n):
+    return f"{n / 1024 ** 2:.0f} MiB"
+
+class Governor:
+    """
+    Samples and throttles the builds returned by builds() on a background
+    thread; see the module docstring. Builds expose .pid (the running
+    command, or None), .state, .phase, .jobs, .started, .throttled,
+    .tree_rss and .shed_to, and lend_slots()/reclaim_slots().
+    """
+    def __init__(self, builds, log=print):
+        self._builds = builds
+        self.log = log
+        self._paused = {}  # build -> (paused at, reason)
+        self._exempt = {}  # build -> monotonic time its pause exemption ends
+        self._last_shed = float("-inf")
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop sampling and resume anything still paused."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        for build in list(self._paused):
+            self._resume(build, _processes(), "builds finished")
+
+    def _loop(self):
+        while not self._stop.wait(INTERVAL):
+            try:
+                self.sample()
+            except OSError as e:
+                self.log(f"[GOVERN] sampling failed: {e}")
+
+    def sample(self):
+        builds = self._builds()
+        if not any(b.state == "running" for b in builds) and not self._paused:
+            return
+        procs = _processes()
+        now = time.monotonic()
+        for build in [b for b in self._paused if b not in builds]:
+            # Finished and forgotten by the scheduler before a sample saw it
+            del self._paused[build]
+            build.throttled = None
+        for build in [b for b in self._exempt if b not in builds]:
+            del self._exempt[build]
+        running = []
+        for build in builds:
+            if build.state != "running" or not build.pid:
+                if build in self._paused and build.state != "running":
+                    del self._paused[build]
+                    build.throttled = None
+                continue
+            tree = process_tree(build.pid, procs)
+            build.tree_rss = sum(procs[pid][1] for pid in tree)
+            running.append(build)
+            if build in self._paused:
+                # Children forked just before the stop would otherwise run on
+                _signal_all(tree, signal.SIGSTOP)
+
+        for build, (paused_at, _) in list(self._paused.items()):
+            if now - paused_at > PAUSE_MAX:
+                self._exempt[build] = now + PAUSE_MAX
+                self._resume(build, procs, f"paused for over {PAUSE_MAX:.0f}s")
+                return
+
+        free = jobs.available_memory()
+        load = jobs.load_average()
+        low_memory = free is not None and free < MIN_FREE_MEM
+        candidates = [b for b in running
+                      if b not in self._paused and self._exempt.get(b, 0) <= now]
+        sheddable = [b for b in running
+                     if b not in self._paused and b.phase == "compile" and b.jobs > 1]
+        if low_memory and sheddable and now - self._last_shed >= SHED_INTERVAL:
+            build = max(sheddable, key=lambda b: b.tree_rss)
+            self._shed(build, procs, f"low memory: {_mib(free)} free")
+        elif load > MAX_LOAD and candidates and len(running) - len(self._paused) > 1:
+            build = max(candidates, key=lambda b: b.started)
+            self._pause(build, procs, f"high load: {load:.1f}")
+        elif self._paused and not low_memory and load <= MAX_LOAD * RESUME_LOAD_FACTOR:
+            build = min(self._paused, key=lambda b: self._paused[b][0])
+            self._resume(build, procs, f"{_mib(free) if free is not None else '?'} free, load {load:.1f}")
+
+    def _shed(self, build, procs, reason):
+        self._last_shed = time.monotonic()
+        build.shed_to = max(1, build.jobs // 2)
+        self.log(f"[GOVERN] Restarting make for {build.name} with -j{build.shed_to} instead of "
+                 f"-j{build.jobs} ({reason}; tree RSS {_mib(build.tree_rss)})")
+        _signal_all(process_tree(build.pid, procs), signal.SIGTERM)
+
+    def _pause(self, build, procs, reason):
+        _signal_all(process_tree(build.pid, procs), signal.SIGSTOP)
+        build.lend_slots()
+        self._paused[build] = (time.monotonic(), reason)
+        build.throttled = f"paused: {reason}"
+        self.log(f"[GOVERN] Paused {build.name} ({reason}; tree RSS {_mib(build.tree_rss)})")
+        build._report()
+
+    def _resume(self, build, procs, reason):
+        self._paused.pop(build, None)
+        build.reclaim_slots()
+        if build.pid:
+            _signal_all(process_tree(build.pid, procs), signal.SIGCONT)
+        build.throttled = None
+        self.log(f"[GOVERN] Resumed {build.name} ({reason})")
+        build._report()
@@ -0,0 +1,124 @@
+"""
+Incremental rebuild support for the build engine.
+
+Each package gets a persistent work dir, work/<package>/{src,build}. A new
+release is synced into src file by file: unchanged files keep their old
+mtimes and changed ones all get one fresh mtime, so make in the persistent
+out-of-tree build dir only redoes what changed. configure runs with a
+config.cache per toolchain and package, and is skipped entirely when the
+recipe flags, toolchain and source tarball hash match the last run.
+"""
+import filecmp
+import hashlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import time
+
+import fsutil
+from paths import CACHE_DIR
+
+WORK_DIR = os.path.join(CACHE_DIR, "work")
+STAMP_FILE = ".redrose-configure.json"
+
+_toolchain = None
+
+def toolchain_id():
+    """Short hash of the C compiler's version banner and the host arch."""
+    global _toolchain
+    if _toolchain is None:
+        cc = os.environ.get("CC", "cc")
+        try:
+            banner = subprocess.run([cc, "--version"], stdout=subprocess.PIPE,
+                                    stderr=subprocess.DEVNULL, text=True).stdout.splitlines()[:1]
+        except OSError:
+            banner = []
+        ident = f"{cc}|{''.join(banner)}|{platform.machine()}"
+        _toolchain = hashlib.sha256(ident.encode("utf-8")).hexdigest()[:16]
+    return _toolchain
+
+def package_dirs(package):
+    """Return (src_dir, build_dir) for package, creating them if needed."""
+    base = os.path.join(WORK_DIR, package)
+    src_dir = os.path.join(base, "src")
+    build_dir = os.path.join(base, "build")
+    os.makedirs(src_dir, exist_ok=True)
+    os.makedirs(build_dir, exist_ok=True)
+    return src_dir, build_dir
+
+def config_cache_path(package):
+    path = os.path.join(WORK_DIR, "config-cache", toolchain_id(), f"{package}.cache")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+def _same_file(a, b):
+    if os.path.islink(a) or os.path.islink(b):
+        return os.path.islink(a) and os.path.islink(b) and os.readlink(a) == os.readlink(b)
+    try:
+        return filecmp.cmp(a, b, shallow=False) and \
+            os.stat(a).st_mode == os.stat(b).st_mode
+    except OSError:
+        return False
+
+def sync_tree(incoming, dest):
+    """
+    Make dest identical to incoming, touching only files whose content
+    changed. Returns (changed, removed) counts. incoming is consumed.
+    """
+    stamp = time.time()
+    changed = removed = 0
+    seen = set()
+    for root, dirs, files in os.walk(incoming):
+        rel_root = os.path.relpath(root, incoming)
+        target_root = os.path.normpath(os.path.join(dest, rel_root))
+        if os.path.lexists(target_root) and not os.path.isdir(target_root):
+            os.remove(target_root)
+        os.makedirs(target_root, exist_ok=True)
+        seen.add(os.path.normpath(rel_root))
+        for name in files + [d for d in dirs if os.path.islink(os.path.join(root, d))]:
+            rel = os.path.normpath(os.path.join(rel_root, name))
+            seen.add(rel)
+            src = os.path.join(root, name)
+            dst = os.path.join(dest, rel)
+            if os.path.lexists(dst) and _same_file(src, dst):
+                continue
+            if os.path.isdir(dst) and not os.path.islink(dst):
+                shutil.rmtree(dst)
+            os.replace(src, dst)
+            if not os.path.islink(dst):
+                os.utime(dst, (stamp, stamp))
+            changed += 1
+    for root, dirs, files in os.walk(dest, topdown=False):
+        for name in files + dirs:
+            path = os.path.join(root, name)
+            rel = os.path.normpath(os.path.relpath(path, dest))
+            if rel in seen:
+                continue
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+            removed += 1
+    shutil.rmtree(incoming, ignore_errors=True)
+    return changed, removed
+
+def configure_stamp(args, source_sha256):
+    return {"args": list(args), "toolchain": toolchain_id(), "source": source_sha256}
+
+def configure_needed(build_dir, stamp):
+    """True unless build_dir was configured with exactly this stamp and still has a Makefile."""
+    if not os.path.exists(os.path.join(build_dir, "Makefile")):
+        return True
+    return fsutil.read_json(os.path.join(build_dir, STAMP_FILE)) != stamp
+
+def write_stamp(build_dir, stamp):
+    with open(os.path.join(build_dir, STAMP_FILE), "w", encoding="utf-8") as f:
+        json.dump(stamp, f)
+
+def clear_stamp(build_dir):
+    try:
+        os.remove(os.path.join(build_dir, STAMP_FILE))
+    except OSError:
+        pass
@@ -0,0 +1,70 @@
+"""
+Parallel make sizing for the builders.
+
+The job count is the smallest of: usable CPUs, CPUs not already busy (by
+the 1-minute load average) and what the available memory can hold at
+MEM_PER_JOB each. REDROSE_JOBS or an explicit value overrides it. make is
+also given -l so builds running side by side back off when the machine
+is saturated.
+"""
+import os
+
+# Rough peak memory of one compiler process on our packages
+MEM_PER_JOB = 512 * 1024 * 1024
+
+def cpu_count():
+    try:
+        return len(os.sched_getaffinity(0)) or 1
+    except (AttributeError, OSError):
+        return os.cpu_count() or 1
+
+def available_memory():
+    """MemAvailable from /proc/meminfo in bytes, or None if unknown."""
+    try:
+        with open("/proc/meminfo", "r", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+def load_average():
+    try:
+        return os.getloadavg()[0]
+    except OSError:
+        return 0.0
+
+def make_jobs(override=None):
+    """
+    Return (jobs, reason). override (or $REDROSE_JOBS) wins when it is a
+    positive integer; otherwise the count is derived from CPUs, load and memory.
+    """
+    for value, source in ((override, "flag"), (os.environ.get("REDROSE_JOBS"), "REDROSE_JOBS")):
+        if value in (None, ""):
+            continue
+        try:
+            jobs = int(value)
+        except ValueError:
+            continue
+        if jobs > 0:
+            return jobs, f"set by {source}"
+
+    cpus = cpu_count()
+    load = load_average()
+    idle = max(1, int(cpus - load + 0.5))
+    mem = available_memory()
+    by_mem = max(1, mem // MEM_PER_JOB) if mem else cpus
+    jobs = max(1, min(cpus, idle, by_mem))
+    mem_text = f"{mem / 2**30:.1f}GiB" if mem else "unknown"
+    return jobs, f"cpus={cpus} load={load:.2f} mem_available={mem_text}"
+
+def load_limit():
+    """Load average above which make should not start new jobs."""
+    return cpu_count()
+
+def make_command(jobs, target=None):
+    cmd = ["make", f"-j{jobs}", f"-l{load_limit()}"]
+    if target:
+        cmd.append(target)
+    return cmd
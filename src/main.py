@@ -1,246 +1,1133 @@
 #!/usr/bin/env python3
+import os
 import threading
-import subprocess
+import queue
+import collections
 import re
 import sys
 import time
 import json
+import codecs
+import contextlib
+import contextvars
+import zlib
+from urllib.parse import urlsplit, urljoin
 
-try:
-    import tkinter as tk
-    from tkinter import messagebox, scrolledtext
-except Exception as e:
-    print("Tkinter is required to run this program. Install tkinter for your Python distribution.", e)
-    raise
-
-# Prefer 'requests' for HTTP; if not available, try urllib
-try:
-    import requests
-except Exception:
-    requests = None
-    import urllib.request as _urllib
-
-# Version comparison: try packaging.version, fallback to distutils or a simple comparator
-try:
-    from packaging import version as _packaging_version
-    def parse_version(v):
-        return _packaging_version.Version(v)
-    def version_gt(a, b):
-        return parse_version(a) > parse_version(b)
-except Exception:
-    # fallback: distutils (works in many environments)
+import fsutil
+from paths import CACHE_DIR, STATE_DIR
+import progress
+import registry
+from versions import is_version, latest_version, version_gt, version_key
+
+# Heavy or optional modules (tkinter, requests, brotli, packaging) are
+# imported on first use, so a headless --check run never loads them.
+tk = None
+messagebox = None
+scrolledtext = None
+
+def _import_tk():
+    global tk, messagebox, scrolledtext
     try:
-        from distutils.version import LooseVersion as _LooseVersion
-        def parse_version(v):
-            return _LooseVersion(v)
-        def version_gt(a, b):
-            return parse_version(a) > parse_version(b)
-    except Exception:
-        # final fallback: simple semantic splitter (handles numeric dotted versions)
-        def parse_version(v):
-            parts = []
-            for p in re.split(r'[.\-+]', str(v)):
-                if p.isdigit():
-                    parts.append(int(p))
-                else:
-                    # non-numeric fallback
-                    parts.append(p)
-            return parts
-        def version_gt(a, b):
-            pa = parse_version(a)
-            pb = parse_version(b)
-            return pa > pb
+        import tkinter as _tk
+        from tkinter import messagebox as _messagebox, scrolledtext as _scrolledtext
+    except Exception as e:
+        print("Tkinter is required to run the GUI. Install tkinter for your Python distribution,"
+              " or use --check for a headless run.", e)
+        raise
+    tk, messagebox, scrolledtext = _tk, _messagebox, _scrolledtext
 
-# -----------------------------
-# Local (current) versions
-# -----------------------------
-curl_version = "8.17.0"
-bash_version = "5.3"
-coreutils_version = "9.9"
+_optional_modules = {}
+
+def _optional_import(name):
+    """Import an optional module once; return None if it is not installed."""
+    if name not in _optional_modules:
+        try:
+            _optional_modules[name] = __import__(name)
+        except Exception:
+            _optional_modules[name] = None
+    return _optional_modules[name]
+
+# Version check limits: one wall-clock deadline for the whole check and a
+# cap on simultaneous connections to any single upstream host.
+CHECK_DEADLINE = 20
+MAX_CONNECTIONS_PER_HOST = 2
+
+# Saved upstream versions (written by every check and by --watch). The GUI
+# paints from this file and only checks upstream once it is older than
+# VERSION_STATE_MAX_AGE. The watcher polls each package every WATCH_INTERVAL
+# seconds (+/- WATCH_JITTER), retrying failures after WATCH_RETRY_MIN seconds,
+# doubling up to WATCH_INTERVAL.
+VERSION_STATE_FILE = os.path.join(STATE_DIR, "versions.json")
+WATCH_INTERVAL = int(os.environ.get("REDROSE_WATCH_INTERVAL", "3600"))
+WATCH_JITTER = 0.1
+WATCH_RETRY_MIN = 60
+VERSION_STATE_MAX_AGE = int(os.environ.get("REDROSE_VERSION_MAX_AGE", str(WATCH_INTERVAL * 2)))
 
-# Build commands (as you specified)
-BUILD_COMMANDS = {
-    "coreutils": "gnome-terminal -- /usr/bin/coreutils",   # user-provided command
-    "bash": "gnome-terminal -- /usr/bin/build-bash",
-    "curl": "gnome-terminal -- /usr/bin/build-curl",
-}
+# On-disk HTTP cache for upstream pages. Entries younger than HTTP_CACHE_TTL
+# seconds are reused without touching the network; older ones are revalidated
+# with If-None-Match / If-Modified-Since.
+HTTP_CACHE_TTL = int(os.environ.get("REDROSE_HTTP_TTL", "600"))
+HTTP_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+# Logging: the GUI log is flushed from the Tk thread every
+# LOG_FLUSH_INTERVAL_MS and keeps the last LOG_HISTORY_LINES lines; the full
+# log goes to a rotating file.
+LOG_FILE = os.path.join(STATE_DIR, "maintain.log")
+LOG_FILE_MAX_BYTES = 5 * 1024 * 1024
+LOG_FILE_BACKUPS = 3
+LOG_FLUSH_INTERVAL_MS = 50
+LOG_HISTORY_LINES = 5000
+
+# Shared keep-alive connection pool: idle connections kept per host, and
+# retries (with exponential backoff) for connection errors and 429/5xx.
+HTTP_POOL_SIZE = 4
+HTTP_RETRIES = 2
+HTTP_BACKOFF = 0.5
+HTTP_RETRY_STATUSES = (429, 500, 502, 503, 504)
+HTTP_CHUNK_SIZE = 16 * 1024
+HTTP_MAX_REDIRECTS = 5
 
 # -----------------------------
 # Utilities: HTTP GET wrapper
 # -----------------------------
-def http_get_text(url, timeout=12):
-    """Fetch text content from URL. Use requests if available, otherwise urllib."""
-    if requests:
-        r = requests.get(url, timeout=timeout)
-        r.raise_for_status()
-        return r.text
-    else:
-        with _urllib.urlopen(url, timeout=timeout) as resp:
-            raw = resp.read()
-            # try to decode
-            return raw.decode('utf-8', errors='replace')
+_host_slots = {}
+_host_slots_lock = threading.Lock()
+
+class CheckDeadline:
+    """
+    The time limit of one version check. Requests made under it (see
+    _deadline_var) wait for a host slot only until the deadline, and
+    expire() aborts the responses still open, so fetches the check gave
+    up on do not keep their host slots into the next check.
+    """
+    def __init__(self, seconds):
+        self.at = time.monotonic() + seconds
+        self.expired = False
+        self._open = set()
+        self._lock = threading.Lock()
+
+    def remaining(self):
+        return self.at - time.monotonic()
+
+    def track(self, resp):
+        with self._lock:
+            if not self.expired:
+                self._open.add(resp)
+                return
+        resp.abort()
+        raise TimeoutError("version check deadline passed")
+
+    def untrack(self, resp):
+        with self._lock:
+            self._open.discard(resp)
+
+    def expire(self):
+        with self._lock:
+            self.expired = True
+            pending, self._open = self._open, set()
+        for resp in pending:
+            resp.abort()
+
+# The deadline of the check this thread is fetching for, if any. Threads
+# started for a check run in a copy of its context (contextvars.copy_context).
+_deadline_var = contextvars.ContextVar("check_deadline", default=None)
+
+@contextlib.contextmanager
+def _host_slot(url):
+    """Hold one of url's host's MAX_CONNECTIONS_PER_HOST slots (until the check deadline at most)."""
+    host = urlsplit(url).netloc
+    with _host_slots_lock:
+        slot = _host_slots.get(host)
+        if slot is None:
+            slot = threading.BoundedSemaphore(MAX_CONNECTIONS_PER_HOST)
+            _host_slots[host] = slot
+    deadline = _deadline_var.get()
+    if deadline is None:
+        slot.acquire()
+    elif deadline.expired or not slot.acquire(timeout=max(0.0, deadline.remaining())):
+        raise TimeoutError(f"no connection to {host} before the version check deadline")
+    try:
+        yield
+    finally:
+        slot.release()
+
+class HttpCache:
+    """
+    Bodies and validators of fetched URLs, one <sha256(url)>.body/.json pair
+    per entry. Least recently used entries are evicted beyond max_bytes.
+    """
+    def __init__(self, directory, ttl=HTTP_CACHE_TTL, max_bytes=HTTP_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+
+    def _paths(self, url):
+        import hashlib
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.directory, key)
+        return base + ".json", base + ".body"
+
+    def _write(self, path, data):
+        fsutil.write_atomic(path, data)
+
+    def lookup(self, url):
+        """Return the cached metadata dict for url (with 'body' bytes) or None."""
+        meta_path, body_path = self._paths(url)
+        meta = fsutil.read_json(meta_path)
+        if not isinstance(meta, dict):
+            return None
+        try:
+            with open(body_path, "rb") as f:
+                meta["body"] = f.read()
+        except OSError:
+            return None
+        return meta
+
+    def is_fresh(self, entry):
+        return time.time() - entry.get("fetched_at", 0) < self.ttl
+
+    def touch(self, url, entry, refetched=False):
+        """Record a use of entry; refetched=True also restarts its TTL."""
+        meta = {k: v for k, v in entry.items() if k != "body"}
+        meta["used_at"] = time.time()
+        if refetched:
+            meta["fetched_at"] = meta["used_at"]
+        try:
+            self._write(self._paths(url)[0], json.dumps(meta).encode("utf-8"))
+        except OSError:
+            pass
+
+    def store(self, url, body, etag=None, last_modified=None, complete=True):
+        meta_path, body_path = self._paths(url)
+        now = time.time()
+        meta = {"url": url, "etag": etag, "last_modified": last_modified,
+                "fetched_at": now, "used_at": now, "size": len(body),
+                "complete": complete}
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            self._write(body_path, body)
+            self._write(meta_path, json.dumps(meta).encode("utf-8"))
+            self._evict()
+        except OSError as e:
+            log(f"[WARN] Could not write HTTP cache entry for {url}: {e}")
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            meta = fsutil.read_json(path)
+            if not isinstance(meta, dict):
+                continue
+            entries.append((meta.get("used_at", 0), path, meta.get("size", 0)))
+            total += meta.get("size", 0)
+        entries.sort()
+        while total > self.max_bytes and entries:
+            _, path, size = entries.pop(0)
+            for p in (path, path[:-len(".json")] + ".body"):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+            total -= size
+
+    def count(self, kind):
+        with self._lock:
+            setattr(self, kind, getattr(self, kind) + 1)
+
+    def summary(self):
+        return f"hits={self.hits} revalidated={self.revalidated} misses={self.misses}"
+
+_http_cache = HttpCache(os.path.join(CACHE_DIR, "http"))
+
+class HttpError(Exception):
+    def __init__(self, url, status, reason=None):
+        super().__init__(f"HTTP {status} for {url}" + (f" ({reason})" if reason else ""))
+        self.url = url
+        self.status = status
+
+def _proxy_for(scheme, host):
+    """
+    (host, port, Proxy-Authorization value or None) of the proxy to reach
+    scheme://host through, from http_proxy/https_proxy/no_proxy as urllib
+    reads them; None to connect directly.
+    """
+    import urllib.request
+    proxy = urllib.request.getproxies().get(scheme)
+    if not proxy or urllib.request.proxy_bypass(host):
+        return None
+    parts = urlsplit(proxy if "://" in proxy else "http://" + proxy)
+    auth = None
+    if parts.username:
+        import base64
+        from urllib.parse import unquote
+        credentials = f"{unquote(parts.username)}:{unquote(parts.password or '')}"
+        auth = "Basic " + base64.b64encode(credentials.encode("utf-8")).decode("ascii")
+    return parts.hostname, parts.port or 80, auth
+
+class _ConnectionPool:
+    """
+    Minimal keep-alive pool over http.client, used when requests is missing.
+    Proxies are honoured as urllib does: plain HTTP is sent to the proxy,
+    HTTPS is tunnelled through it with CONNECT.
+    """
+    def __init__(self, size):
+        self.size = size
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _acquire(self, scheme, host, timeout, proxy=None):
+        with self._lock:
+            idle = self._idle.get((scheme, host))
+            if idle:
+                conn = idle.pop()
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                return conn
+        import http.client
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        if proxy is None:
+            return cls(host, timeout=timeout)
+        proxy_host, proxy_port, auth = proxy
+        if scheme != "https":
+            return http.client.HTTPConnection(proxy_host, proxy_port, timeout=timeout)
+        conn = cls(proxy_host, proxy_port, timeout=timeout)
+        conn.set_tunnel(host, headers={"Proxy-Authorization": auth} if auth else None)
+        return conn
+
+    def _release(self, scheme, host, conn):
+        with self._lock:
+            idle = self._idle.setdefault((scheme, host), [])
+            if len(idle) < self.size:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def open(self, url, headers, timeout):
+        """
+        Send a single GET (no retries or redirects) and return
+        (status, headers, chunk iterator, close, abort). The connection goes
+        back to the pool only if the body was read to the end; abort (from
+        another thread) makes the reader fail instead.
+        """
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        key = (parts.scheme, parts.netloc)
+        proxy = _proxy_for(*key)
+        if proxy and parts.scheme != "https":
+            # Through an HTTP proxy the request names the whole URL
+            path = f"{parts.scheme}://{parts.netloc}{path}"
+            if proxy[2]:
+                headers = dict(headers, **{"Proxy-Authorization": proxy[2]})
+        conn = self._acquire(*key, timeout, proxy)
+        try:
+            conn.request("GET", path, headers=headers)
+            # getresponse() drops conn.sock when the server will close; the body still uses it
+            sock = conn.sock
+            resp = conn.getresponse()
+        except Exception:
+            conn.close()
+            raise
+        state = {"done": False, "closed": False, "aborted": False}
+
+        def chunks(size=HTTP_CHUNK_SIZE):
+            decoder = _decoder(resp.headers.get("Content-Encoding"))
+            while True:
+                data = resp.read(size)
+                if state["aborted"]:
+                    raise TimeoutError(f"fetch of {url} abandoned at the version check deadline")
+                if not data:
+                    break
+                data = decoder.decompress(data) if decoder else data
+                if data:
+                    yield data
+            if decoder:
+                tail = decoder.flush()
+                if tail:
+                    yield tail
+                if not decoder.eof:
+                    raise ValueError(f"truncated {resp.headers.get('Content-Encoding')} body from {url}")
+            state["done"] = True
+
+        def close():
+            if state["closed"]:
+                return
+            state["closed"] = True
+            if not state["done"] and resp.length == 0:
+                # 304 and friends: nothing left to read, keep the connection
+                resp.read()
+                state["done"] = True
+            if state["done"] and not resp.will_close and not state["aborted"]:
+                self._release(*key, conn)
+            else:
+                conn.close()
+
+        def abort():
+            state["aborted"] = True
+            import socket
+            try:
+                # Wakes a reader blocked in recv (close() alone would not)
+                socket.socket.shutdown(sock, socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+        return resp.status, resp.headers, chunks, close, abort
+
+def _decoder(encoding):
+    """Incremental decompressor for a Content-Encoding, or None for identity."""
+    encoding = (encoding or "").strip().lower()
+    if encoding == "gzip":
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if encoding == "deflate":
+        return zlib.decompressobj()
+    if encoding == "br" and _optional_import("brotli"):
+        return _BrotliDecoder()
+    return None
+
+class _BrotliDecoder:
+    """zlib-style decompress()/flush() over brotli.Decompressor."""
+    def __init__(self):
+        self._decompressor = _optional_import("brotli").Decompressor()
+
+    def decompress(self, data):
+        return self._decompressor.process(data)
+
+    def flush(self):
+        return b""
+
+    @property
+    def eof(self):
+        return self._decompressor.is_finished()
+
+class HttpResponse:
+    """
+    An in-flight GET whose body is consumed incrementally with iter_chunks().
+    Opened under a CheckDeadline, it is aborted if still open when that
+    check gives up.
+    """
+    def __init__(self, url, status, headers, chunks, close, abort=None):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.etag = headers.get("ETag")
+        self.last_modified = headers.get("Last-Modified")
+        self._chunks = chunks
+        self._close = close
+        self._abort = abort
+        self._deadline = _deadline_var.get()
+        if self._deadline:
+            try:
+                self._deadline.track(self)
+            except TimeoutError:
+                close()
+                raise
+
+    def iter_chunks(self, size=HTTP_CHUNK_SIZE):
+        return self._chunks(size)
+
+    def read(self):
+        return b"".join(self.iter_chunks())
+
+    def abort(self):
+        """Break off the transfer (from any thread); the reader then raises."""
+        if self._abort:
+            self._abort()
+
+    def close(self):
+        if self._deadline:
+            self._deadline.untrack(self)
+        self._close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class HttpSession:
+    """
+    Shared HTTP session: a pooled requests.Session when requests is
+    installed, otherwise a keep-alive http.client pool with the same
+    retry/backoff, redirect, proxy and compression behaviour.
+    """
+    def __init__(self, pool_size=HTTP_POOL_SIZE, retries=HTTP_RETRIES, backoff=HTTP_BACKOFF):
+        self.retries = retries
+        self.backoff = backoff
+        encodings = "gzip, deflate, br" if _optional_import("brotli") else "gzip, deflate"
+        self.headers = {"Accept-Encoding": encodings, "User-Agent": "redrose-maintain"}
+        requests = _optional_import("requests")
+        if requests:
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+            self._session = requests.Session()
+            self._session.headers.update(self.headers)
+            self._session.max_redirects = HTTP_MAX_REDIRECTS
+            adapter = HTTPAdapter(
+                pool_connections=pool_size, pool_maxsize=pool_size,
+                max_retries=Retry(total=retries, backoff_factor=backoff,
+                                  status_forcelist=HTTP_RETRY_STATUSES,
+                                  raise_on_status=False))
+            self._session.mount("https://", adapter)
+            self._session.mount("http://", adapter)
+            self._pool = None
+        else:
+            self._session = None
+            self._pool = _ConnectionPool(pool_size)
+
+    def open(self, url, headers=None, timeout=12):
+        """
+        Start a GET and return an HttpResponse without reading the body.
+        304 is returned as a response; other 4xx/5xx raise HttpError.
+        """
+        if self._session is not None:
+            r = self._session.get(url, headers=headers, timeout=timeout, stream=True)
+            if r.status_code >= 400:
+                r.close()
+                raise HttpError(url, r.status_code)
+            aborted = []
+            def chunks(size):
+                for chunk in r.iter_content(size):
+                    if aborted:
+                        break
+                    yield chunk
+                if aborted:
+                    raise TimeoutError(f"fetch of {url} abandoned at the version check deadline")
+            def abort():
+                aborted.append(True)
+                # urllib3 >= 2.3 can wake a blocked read; older ones stop at the next chunk
+                shutdown = getattr(r.raw, "shutdown", None)
+                if shutdown:
+                    shutdown()
+            return HttpResponse(url, r.status_code, r.headers, chunks, r.close, abort)
+
+        from http.client import HTTPException
+        all_headers = dict(self.headers)
+        all_headers.update(headers or {})
+        attempt = 0
+        redirects = 0
+        while True:
+            try:
+                status, resp_headers, chunks, close, abort = self._pool.open(url, all_headers, timeout)
+            except (OSError, HTTPException):
+                if attempt >= self.retries:
+                    raise
+                status = None
+            if status is not None and status != 304 and (
+                    status in (301, 302, 303, 307, 308) or status >= 400):
+                # Drain the (small) body so the connection can be reused
+                for _ in chunks():
+                    pass
+                close()
+            if status in (301, 302, 303, 307, 308):
+                if redirects >= HTTP_MAX_REDIRECTS:
+                    raise HttpError(url, status, f"more than {HTTP_MAX_REDIRECTS} redirects")
+                url = urljoin(url, resp_headers.get("Location", ""))
+                redirects += 1
+                continue
+            if status is None or status in HTTP_RETRY_STATUSES:
+                if attempt < self.retries:
+                    time.sleep(self.backoff * (2 ** attempt))
+                    attempt += 1
+                    continue
+            if status >= 400:
+                raise HttpError(url, status)
+            return HttpResponse(url, status, resp_headers, chunks, close, abort)
+
+    def get(self, url, headers=None, timeout=12):
+        """GET url; return (status, body bytes, etag, last_modified). 304 is not an error."""
+        with self.open(url, headers, timeout) as resp:
+            body = resp.read() if resp.status != 304 else b""
+            return resp.status, body, resp.etag, resp.last_modified
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+def http_session():
+    """Return the process-wide HttpSession, creating it on first use."""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            _http_session = HttpSession()
+        return _http_session
+
+def _iter_decoded(byte_chunks):
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    with contextlib.closing(byte_chunks):
+        for chunk in byte_chunks:
+            text = decoder.decode(chunk)
+            if text:
+                yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+def _iter_bytes(data, size=HTTP_CHUNK_SIZE):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+def _conditional_headers(entry):
+    headers = {}
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+def _iter_cached(url, entry, timeout):
+    """
+    Replay a cached body. Entries saved by an early-exiting reader only hold
+    the prefix that reader needed; if more is wanted, fetch the rest.
+    """
+    body = entry["body"]
+    yield from _iter_bytes(body)
+    if entry.get("complete", True):
+        return
+    log(f"[CACHE] partial entry exhausted, refetching: {url}")
+    with _host_slot(url):
+        with http_session().open(url, timeout=timeout) as resp:
+            skip = len(body)
+            for chunk in resp.iter_chunks():
+                if skip:
+                    cut = min(skip, len(chunk))
+                    chunk = chunk[cut:]
+                    skip -= cut
+                if chunk:
+                    yield chunk
+
+def _iter_url_bytes(url, timeout):
+    entry = _http_cache.lookup(url)
+    if entry and _http_cache.is_fresh(entry):
+        _http_cache.count("hits")
+        _http_cache.touch(url, entry)
+        log(f"[CACHE] hit: {url}")
+        yield from _iter_cached(url, entry, timeout)
+        return
+
+    with _host_slot(url):
+        with http_session().open(url, _conditional_headers(entry), timeout) as resp:
+            if resp.status == 304 and entry:
+                _http_cache.count("revalidated")
+                _http_cache.touch(url, entry, refetched=True)
+                log(f"[CACHE] not modified: {url}")
+            else:
+                _http_cache.count("misses")
+                log(f"[CACHE] miss: {url}")
+                # Cache whatever the reader consumed; an early exit stores
+                # the prefix it needed, marked incomplete.
+                received = []
+                complete = False
+                try:
+                    for chunk in resp.iter_chunks():
+                        received.append(chunk)
+                        yield chunk
+                    complete = True
+                finally:
+                    _http_cache.store(url, b"".join(received), resp.etag,
+                                      resp.last_modified, complete=complete)
+                return
+    yield from _iter_cached(url, entry, timeout)
+
+def http_iter_text(url, timeout=12):
+    """
+    Stream the text of URL in chunks, through the on-disk cache. Closing the
+    generator early (e.g. once a parser has its answer) drops the connection
+    without reading the rest of the body.
+    """
+    return _iter_decoded(_iter_url_bytes(url, timeout))
+
+def http_iter_lines(url, timeout=12):
+    """Stream the lines of URL (without line endings); see http_iter_text."""
+    pending = ""
+    with contextlib.closing(http_iter_text(url, timeout)) as chunks:
+        for chunk in chunks:
+            pending += chunk
+            lines = pending.splitlines(keepends=True)
+            pending = lines.pop() if lines and not lines[-1].endswith(("\n", "\r")) else ""
+            for line in lines:
+                yield line.rstrip("\r\n")
+    if pending:
+        yield pending
 
 # -----------------------------
 # Logging helper (GUI will set this)
 # -----------------------------
 _log_widget = None
 _log_lock = threading.Lock()
+_log_stream = sys.stdout  # headless runs send this to stderr or silence it
+
+# Lines waiting for the GUI. Anything older than the widget can show anyway
+# is dropped here (it is still in the log file) and counted.
+_log_pending = collections.deque(maxlen=LOG_HISTORY_LINES)
+_log_dropped = 0
+
+_file_logger = None
+
+def _log_to_file(line):
+    """Append line to the rotating log file; the disk write happens on a listener thread."""
+    global _file_logger
+    if _file_logger is None:
+        with _log_lock:
+            if _file_logger is None:
+                import logging
+                import logging.handlers
+                logger = logging.getLogger("redrose-maintain")
+                logger.propagate = False
+                logger.setLevel(logging.INFO)
+                try:
+                    os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
+                    handler = logging.handlers.RotatingFileHandler(
+                        LOG_FILE, maxBytes=LOG_FILE_MAX_BYTES,
+                        backupCount=LOG_FILE_BACKUPS, encoding="utf-8")
+                except OSError as e:
+                    print(f"[WARN] Cannot open log file {LOG_FILE}: {e}", file=sys.stderr)
+                    handler = logging.NullHandler()
+                records = queue.SimpleQueue()
+                logger.addHandler(logging.handlers.QueueHandler(records))
+                listener = logging.handlers.QueueListener(records, handler)
+                listener.start()
+                import atexit
+                atexit.register(listener.stop)
+                _file_logger = logger
+    _file_logger.info(line)
 
 def attach_logger(widget):
+    """Send log lines to a Tk text widget; they are flushed from the Tk thread."""
     global _log_widget
     _log_widget = widget
+    widget.after(LOG_FLUSH_INTERVAL_MS, _flush_log_widget)
+
+def _flush_log_widget():
+    """Move pending lines into the widget in one batch, then reschedule."""
+    global _log_dropped
+    widget = _log_widget
+    if widget is None:
+        return
+    with _log_lock:
+        lines = list(_log_pending)
+        _log_pending.clear()
+        dropped = _log_dropped
+        _log_dropped = 0
+    if lines:
+        if dropped:
+            lines.insert(0, f"... {dropped} earlier lines skipped (full log: {LOG_FILE})")
+        widget.configure(state='normal')
+        widget.insert("end", "\n".join(lines) + "\n")
+        # Keep a bounded history in the widget
+        excess = int(widget.index("end-1c").split(".")[0]) - 1 - LOG_HISTORY_LINES
+        if excess > 0:
+            widget.delete("1.0", f"{excess + 1}.0")
+        widget.see("end")
+        widget.configure(state='disabled')
+    widget.after(LOG_FLUSH_INTERVAL_MS, _flush_log_widget)
 
 def log(msg):
+    global _log_dropped
     timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
     line = f"[{timestamp}] {msg}"
     # Print to stdout as well (useful when running headless)
-    print(line)
+    if _log_stream:
+        print(line, file=_log_stream)
+    _log_to_file(line)
     if _log_widget:
         with _log_lock:
-            _log_widget.configure(state='normal')
-            _log_widget.insert(tk.END, line + "\n")
-            _log_widget.see(tk.END)
-            _log_widget.configure(state='disabled')
+            if len(_log_pending) == _log_pending.maxlen:
+                _log_dropped += 1
+            _log_pending.append(line)
 
 # -----------------------------
 # Fetchers
 # -----------------------------
-def fetch_latest_coreutils_from_github(log=log):
+def iter_json_array(chunks):
     """
-    Use GitHub tags API to get latest tag name from coreutils/coreutils.
-    Strips leading 'v' if present.
+    Yield the elements of a top-level JSON array as its text arrives in
+    chunks, without holding the whole document in memory. Raises
+    ValueError (after the elements before the fault) unless the text is
+    exactly one complete array: a truncated or malformed document never
+    passes for a shorter list.
     """
-    url = "https://api.github.com/repos/coreutils/coreutils/tags"
-    log(f"[INFO] Fetching coreutils tags from GitHub API: {url}")
-    try:
-        text = http_get_text(url)
-        data = json.loads(text)
-        if not isinstance(data, list) or not data:
-            log("[WARN] GitHub API returned empty or unexpected data for tags.")
-            return None
-        tags = []
-        for obj in data:
-            if isinstance(obj, dict) and "name" in obj:
-                tags.append(obj["name"].lstrip("v"))
-        if not tags:
-            log("[WARN] No tags parsed from GitHub response.")
-            return None
-        # Sort using version parser and pick latest
-        try:
-            latest = sorted(tags, key=lambda v: parse_version(v))[-1]
-        except Exception:
-            latest = tags[0]
-        log(f"[INFO] Parsed coreutils tags (sample): {', '.join(tags[:8])}")
-        log(f"[INFO] Latest coreutils (from GitHub tags): {latest}")
-        return latest
-    except Exception as e:
-        log(f"[ERROR] Failed to fetch/parse coreutils tags: {e}")
-        return None
+    decoder = json.JSONDecoder()
+    buf = ""
+    # start -> "[" read -> value or ",", alternating -> "]" read
+    state = "start"
+    for chunk in chunks:
+        buf += chunk
+        pos = 0
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n":
+                pos += 1
+            if pos >= len(buf):
+                break
+            c = buf[pos]
+            if state == "start":
+                if c != "[":
+                    raise ValueError("expected a JSON array")
+                state = "first"
+                pos += 1
+            elif state == "end":
+                raise ValueError("unexpected data after the JSON array")
+            elif c == "]" and state in ("first", "comma"):
+                state = "end"
+                pos += 1
+            elif state == "comma":
+                if c != ",":
+                    raise ValueError(f"expected ',' or ']' in the JSON array, got {c!r}")
+                state = "value"
+                pos += 1
+            else:
+                try:
+                    obj, end = decoder.raw_decode(buf, pos)
+                except ValueError:
+                    break  # element continues in the next chunk (or is malformed)
+                if end == len(buf) or buf[end] not in " \t\r\n,]":
+                    break  # a bare number may still be growing ("5" of "5.5")
+                yield obj
+                state = "comma"
+                pos = end
+        buf = buf[pos:]
+    if state == "start":
+        raise ValueError("expected a JSON array")
+    if state != "end":
+        raise ValueError("JSON array is truncated or malformed")
 
-def fetch_latest_bash_from_arch_pkgbuild():
-    url = "https://gitlab.archlinux.org/archlinux/packaging/packages/bash/-/raw/main/PKGBUILD"
-    log(f"[INFO] Fetching bash PKGBUILD from Arch: {url}")
+# -----------------------------
+# GitHub tag index
+# -----------------------------
+TAG_INDEX_DIR = os.path.join(CACHE_DIR, "tags")
+GITHUB_API = os.environ.get("REDROSE_GITHUB_API", "https://api.github.com")
+GITHUB_TAGS_PER_PAGE = 100
+# Pages fetched at once; past this many, more are fetched only while they hold newer tags
+GITHUB_MAX_PAGES = 20
+GITHUB_EXTRA_PAGES_BATCH = 5
 
-    try:
-        text = http_get_text(url)
-
-        # Remove comments
-        lines = []
-        for line in text.splitlines():
-            if "#" in line:
-                line = line.split("#", 1)[0]
-            if line.strip():
-                lines.append(line.strip())
-
-        clean = "\n".join(lines)
-
-        # Extract _basever=...
-        m = re.search(
-            r'_basever\s*=\s*["\']?([0-9]+\.[0-9]+)',
-            clean
-        )
-
-        if not m:
-            log("[WARN] Could not find _basever in PKGBUILD")
-            return None
+_LINK_LAST_RE = re.compile(r'[?&]page=(\d+)[^>]*>;\s*rel="last"')
 
-        basever = m.group(1)
-        log(f"[INFO] Bash base version: {basever}")
-        return basever
+class TagIndex:
+    """
+    Persistent index of a GitHub repository's tags, kept in TAG_INDEX_DIR
+    page by page with each page's ETag. refresh() makes no request within
+    HTTP_CACHE_TTL of the last check; after that it revalidates page 1 and
+    only if that changed fetches pages 2..last (from the Link header)
+    concurrently, each conditionally, so unchanged pages cost a 304.
 
-    except Exception as e:
-        log(f"[ERROR] Failed to fetch/parse PKGBUILD: {e}")
-        return None
+    At most GITHUB_MAX_PAGES pages are fetched up front. For a repo with
+    more, further pages are fetched GITHUB_EXTRA_PAGES_BATCH at a time for as
+    long as each batch holds a version newer than the best so far; the
+    index is then truncated after the first batch that does not, and a
+    warning is logged.
+    """
+    def __init__(self, repo):
+        self.repo = repo
+        self.path = os.path.join(TAG_INDEX_DIR, repo.replace("/", "_") + ".json")
+        self._lock = threading.Lock()
+        self._data = fsutil.read_json(self.path) or {"pages": {}, "checked_at": 0}
+
+    def _save(self):
+        fsutil.write_json(self.path, self._data, indent=None)
+
+    @property
+    def tags(self):
+        pages = self._data["pages"]
+        return [t for n in sorted(pages, key=int) for t in pages[n]["tags"]]
 
+    def _fetch_page(self, page, timeout):
+        """Fetch one page (conditionally); return (changed, last_page)."""
+        stored = self._data["pages"].get(str(page))
+        url = (f"{GITHUB_API}/repos/{self.repo}/tags"
+               f"?per_page={GITHUB_TAGS_PER_PAGE}&page={page}")
+        headers = {"Accept": "application/vnd.github+json"}
+        if stored and stored.get("etag"):
+            headers["If-None-Match"] = stored["etag"]
+        with _host_slot(url):
+            with http_session().open(url, headers, timeout) as resp:
+                if resp.status == 304 and stored:
+                    return False, stored["last"]
+                m = _LINK_LAST_RE.search(resp.headers.get("Link") or "")
+                last = int(m.group(1)) if m else page
+                tags = [obj["name"] for obj in iter_json_array(_iter_decoded(resp.iter_chunks()))
+                        if isinstance(obj, dict) and "name" in obj]
+        with self._lock:
+            self._data["pages"][str(page)] = {"etag": resp.etag, "tags": tags, "last": last}
+        return True, last
+
+    def _fetch_pages(self, pages, timeout):
+        """Fetch pages concurrently; raise the first error (after saving what did arrive)."""
+        errors = []
+        def _fetch(n):
+            try:
+                self._fetch_page(n, timeout)
+            except Exception as e:
+                errors.append(e)
+        # Each page thread runs under the caller's check deadline
+        threads = [threading.Thread(target=contextvars.copy_context().run, args=(_fetch, n),
+                                    daemon=True) for n in pages]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        if errors:
+            self._save()
+            raise errors[0]
+
+    def _newest(self, pages):
+        keys = [version_key(t) for n in pages for t in self._data["pages"][str(n)]["tags"]
+                if is_version(t)]
+        return max(keys, default=None)
+
+    def refresh(self, timeout=12, log=log):
+        """Bring the index up to date and return all tag names."""
+        if self._data["pages"] and time.time() - self._data["checked_at"] < HTTP_CACHE_TTL:
+            log(f"[TAGS] {self.repo}: index checked recently, {len(self.tags)} tags")
+            return self.tags
+        changed, last = self._fetch_page(1, timeout)
+        upto = min(last, GITHUB_MAX_PAGES)
+        if changed or any(str(n) not in self._data["pages"] for n in range(2, upto + 1)):
+            self._fetch_pages(range(2, upto + 1), timeout)
+            # Past the cap, keep going only while pages still bring newer versions
+            while upto < last:
+                best = self._newest(range(1, upto + 1))
+                batch = range(upto + 1, min(upto + GITHUB_EXTRA_PAGES_BATCH, last) + 1)
+                self._fetch_pages(batch, timeout)
+                upto = batch[-1]
+                newest = self._newest(batch)
+                if newest is None or (best is not None and newest <= best):
+                    break
+            if upto < last:
+                log(f"[WARN] {self.repo}: {last} pages of tags; stopped after {upto}, as the "
+                    f"last {GITHUB_EXTRA_PAGES_BATCH} held no newer version (the index is truncated)")
+            for n in [n for n in self._data["pages"] if int(n) > upto]:
+                del self._data["pages"][n]
+            log(f"[TAGS] {self.repo}: page 1 changed, fetched {upto} page(s)")
+        else:
+            log(f"[TAGS] {self.repo}: not modified")
+        self._data["checked_at"] = time.time()
+        self._save()
+        return self.tags
 
-def fetch_latest_curl_from_curlsite(log=log):
+def _fetch_github_tags(name, source, log):
+    tags = TagIndex(source["repo"]).refresh(log=log)
+    if not tags:
+        log(f"[WARN] {name}: no tags parsed from GitHub response.")
+        return None
+    latest = latest_version(tags)
+    log(f"[INFO] {name}: {len(tags)} tags on GitHub; latest: {latest}")
+    return latest
+
+def _fetch_regex(name, source, log):
     """
-    Parse curl.se download page for curl-X.Y.Z.tar.gz filenames.
+    Match source["regex"] line by line. pick "first" stops reading (and
+    drops the connection) at the first match; "max" keeps the best version.
     """
-    url = "https://curl.se/download/"
-    log(f"[INFO] Fetching curl download page: {url}")
+    pattern = re.compile(source["regex"])
+    comment = source.get("comment")
+    first = source.get("pick", "max") == "first"
+    latest = None
+    found = 0
+    with contextlib.closing(http_iter_lines(source["url"])) as lines:
+        for line in lines:
+            if comment:
+                line = line.split(comment, 1)[0]
+            for m in pattern.finditer(line):
+                v = m.group(1)
+                if first:
+                    log(f"[INFO] {name}: {v}")
+                    return v
+                found += 1
+                if latest is None or version_gt(v, latest):
+                    latest = v
+    if latest is None:
+        log(f"[WARN] {name}: no version matched on {source['url']}")
+        return None
+    log(f"[INFO] {name}: found {found} versions; latest: {latest}")
+    return latest
+
+SOURCE_FETCHERS = {"github-tags": _fetch_github_tags, "regex": _fetch_regex}
+
+def fetch_latest(package, log=log):
+    """Latest upstream version of a registry.Package, or None on failure."""
+    source = package.source
+    log(f"[INFO] {package.name}: checking {source.get('url') or source.get('repo')}")
     try:
-        text = http_get_text(url)
-        matches = re.findall(r'curl-([0-9]+\.[0-9]+\.[0-9]+)\.tar\.gz', text)
-        if not matches:
-            log("[WARN] No curl versions detected on page")
-            return None
-        # sort and pick last
-        try:
-            latest = sorted(matches, key=lambda v: parse_version(v))[-1]
-        except Exception:
-            latest = matches[-1]
-        log(f"[INFO] Found {len(matches)} curl versions; latest: {latest}")
-        return latest
+        return SOURCE_FETCHERS[source["type"]](package.name, source, log)
     except Exception as e:
-        log(f"[ERROR] Failed to fetch/parse curl site: {e}")
+        log(f"[ERROR] {package.name}: failed to fetch/parse upstream: {e}")
         return None
 
 # -----------------------------
 # Coordinator: check all versions (threaded)
 # -----------------------------
 class VersionChecker(threading.Thread):
-    def __init__(self, update_callback):
+    def __init__(self, update_callback, names=None):
         super().__init__(daemon=True)
         self.update_callback = update_callback  # function(name, latest, up_status, fetch_ok)
-        self._stop = False
+        self.names = names  # check only these packages (default: all)
+        self._local = None
+
+    def selected(self):
+        return [n for n in registry.names() if self.names is None or n in self.names]
+
+    def local_versions(self):
+        """Installed versions of the checked packages (probed once per checker)."""
+        if self._local is None:
+            self._local = registry.local_versions(self.selected())
+        return self._local
+
+    def _fetch_one(self, name, deadline, results):
+        _deadline_var.set(deadline)
+        try:
+            latest = fetch_latest(registry.get(name))
+        except Exception as e:
+            log(f"[ERROR] {name}: fetcher raised: {e}")
+            latest = None
+        results.put((name, latest))
 
     def run(self):
         log("[INFO] Starting version check...")
-        results = {}
+        started = time.monotonic()
+        deadline = CheckDeadline(CHECK_DEADLINE)
+        results = queue.Queue()
 
-        # coreutils
-        latest_core = fetch_latest_coreutils_from_github()
-        ok_core = latest_core is not None
-        if ok_core:
-            up_core = version_gt(latest_core, coreutils_version)
-        else:
-            up_core = None
-        self.update_callback("coreutils", latest_core, up_core, ok_core)
-
-        # bash
-        latest_bash = fetch_latest_bash_from_arch_pkgbuild()
-        ok_bash = latest_bash is not None
-        if ok_bash:
-            up_bash = version_gt(latest_bash, bash_version)
-        else:
-            up_bash = None
-        self.update_callback("bash", latest_bash, up_bash, ok_bash)
-
-        # curl
-        latest_curl = fetch_latest_curl_from_curlsite()
-        ok_curl = latest_curl is not None
-        if ok_curl:
-            up_curl = version_gt(latest_curl, curl_version)
-        else:
-            up_curl = None
-        self.update_callback("curl", latest_curl, up_curl, ok_curl)
+        # Start every fetch at once; per-host limits are enforced in _iter_url_bytes (_host_slot)
+        for name in self.selected():
+            threading.Thread(target=self._fetch_one, args=(name, deadline, results),
+                             daemon=True).start()
+        # Probe installed versions while the fetches are in flight
+        pending = dict(self.local_versions())
+
+        # Report each result as soon as it arrives
+        while pending:
+            remaining = deadline.remaining()
+            if remaining <= 0:
+                break
+            try:
+                name, latest = results.get(timeout=remaining)
+            except queue.Empty:
+                break
+            local = pending.pop(name)
+            ok = latest is not None
+            up = version_gt(latest, local) if ok and local else None
+            self.update_callback(name, latest, up, ok)
+            record_version_check(name, latest)
 
-        log("[INFO] Version check completed.")
+        # Anything still outstanding missed the deadline; free its connections and host slots
+        deadline.expire()
+        for name in pending:
+            log(f"[WARN] {name}: no result within the {CHECK_DEADLINE}s deadline")
+            self.update_callback(name, None, None, False)
+            record_version_check(name, None)
+
+        log(f"[CACHE] {_http_cache.summary()}")
+        log(f"[INFO] Version check completed in {time.monotonic() - started:.1f}s.")
+
+# -----------------------------
+# Saved version state and watch mode
+# -----------------------------
+_version_state_lock = threading.Lock()
+# This process's latest entry per package, kept even when the state file
+# cannot be written, so the watcher still follows its schedule
+_version_memory = {}
+
+def load_version_state():
+    """{name: {"latest", "checked_at", "ok", "failures", "next_check"}} from the last checks."""
+    data = fsutil.read_json(VERSION_STATE_FILE)
+    return data.get("packages", {}) if isinstance(data, dict) else {}
+
+def _newer(a, b):
+    """Whichever of two state entries was attempted last (either may be None)."""
+    if not a or not b:
+        return a or b
+    return a if a.get("attempted_at", 0) >= b.get("attempted_at", 0) else b
+
+def current_version_state():
+    """load_version_state(), with this process's newer (possibly unsaved) entries on top."""
+    state = load_version_state()
+    with _version_state_lock:
+        for name, entry in _version_memory.items():
+            state[name] = _newer(state.get(name), entry)
+    return state
+
+def _jittered(seconds):
+    import random
+    return seconds * random.uniform(1 - WATCH_JITTER, 1 + WATCH_JITTER)
+
+def _scheduled(entry, latest, now):
+    """A copy of entry updated with one check result and the package's next check time."""
+    entry = dict(entry or {"latest": None, "checked_at": 0, "failures": 0})
+    entry["attempted_at"] = now
+    entry["ok"] = latest is not None
+    if latest is not None:
+        entry.update(latest=latest, checked_at=now, failures=0)
+        entry["next_check"] = now + _jittered(WATCH_INTERVAL)
+    else:
+        entry["failures"] += 1
+        entry["next_check"] = now + _jittered(
+            min(WATCH_RETRY_MIN * 2 ** (entry["failures"] - 1), WATCH_INTERVAL))
+    return entry
+
+def record_version_check(name, latest):
+    """
+    Save one check result and schedule the package's next check. A failure
+    keeps the last known version and backs off exponentially. A state file
+    that cannot be written is logged; the schedule is then kept in memory
+    (see current_version_state).
+    """
+    now = time.time()
+    with _version_state_lock:
+        entry = None
+        try:
+            # Other processes (the watcher, another GUI) update the same file
+            with fsutil.locked(VERSION_STATE_FILE):
+                packages = load_version_state()
+                entry = _scheduled(_newer(packages.get(name), _version_memory.get(name)), latest, now)
+                packages[name] = entry
+                fsutil.write_json(VERSION_STATE_FILE, {"packages": packages, "updated_at": now})
+        except OSError as e:
+            # The check itself succeeded; only the saved state is lost
+            log(f"[WARN] Could not save version state to {VERSION_STATE_FILE}: {e}")
+            if entry is None:
+                entry = _scheduled(_version_memory.get(name), latest, now)
+        _version_memory[name] = entry
+
+def version_state_stale(state, names):
+    """True if any of names has never been checked or was last checked too long ago."""
+    now = time.time()
+    return any(now - state.get(name, {}).get("checked_at", 0) > VERSION_STATE_MAX_AGE
+               for name in names)
+
+def run_watch(once=False):
+    """
+    Poll upstreams forever (or one round with once=True), checking each
+    package when its saved next_check time comes up.
+    """
+    names = registry.names()
+    log(f"[WATCH] Watching {', '.join(names)} every ~{WATCH_INTERVAL}s")
+    while True:
+        state = current_version_state()
+        now = time.time()
+        due = [n for n in names if state.get(n, {}).get("next_check", 0) <= now]
+        if due:
+            VersionChecker(update_callback=lambda *a: None, names=due).run()
+            state = current_version_state()
+        if once:
+            return 0 if all(state.get(n, {}).get("ok") for n in names) else 2
+        wake = min(state.get(n, {}).get("next_check", now) for n in names)
+        time.sleep(max(5.0, wake - time.time()))
 
 # -----------------------------
 # GUI
 # -----------------------------
+STATUS_ROWS_VISIBLE = 10
+STATUS_ROW_HEIGHT = 34
+
 class BuildManagerGUI:
     def __init__(self, master):
         self.master = master
@@ -251,16 +1138,31 @@ class BuildManagerGUI:
         top_frame = tk.Frame(master)
         top_frame.pack(fill=tk.X, padx=12)
 
-        # Left: status labels
-        status_frame = tk.LabelFrame(top_frame, text="Status", padx=8, pady=8)
-        status_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=False, padx=6, pady=6)
+        # One row per registry package: status labels and its build button.
+        # The rows scroll once there are more than STATUS_ROWS_VISIBLE of them.
+        status_frame = tk.LabelFrame(top_frame, text="Packages", padx=8, pady=8)
+        status_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=6, pady=6)
+        names = registry.names()
+        canvas = tk.Canvas(status_frame, highlightthickness=0,
+                           height=min(len(names), STATUS_ROWS_VISIBLE) * STATUS_ROW_HEIGHT)
+        rows_frame = tk.Frame(canvas)
+        canvas.create_window((0, 0), window=rows_frame, anchor="nw")
+        rows_frame.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all"),
+                                                                  width=rows_frame.winfo_reqwidth()))
+        if len(names) > STATUS_ROWS_VISIBLE:
+            scrollbar = tk.Scrollbar(status_frame, orient=tk.VERTICAL, command=canvas.yview)
+            canvas.configure(yscrollcommand=scrollbar.set)
+            scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
         self.status_labels = {}
         self.latest_labels = {}
         self.local_labels = {}
+        self.buttons = {}
+        self.local_versions = {}
 
-        for name in ("coreutils", "bash", "curl"):
-            row = tk.Frame(status_frame)
+        for name in names:
+            row = tk.Frame(rows_frame)
             row.pack(fill=tk.X, pady=4)
             lbl_name = tk.Label(row, text=name.capitalize(), width=12, anchor="w", font=("Segoe UI", 10, "bold"))
             lbl_name.pack(side=tk.LEFT)
@@ -270,34 +1172,30 @@ class BuildManagerGUI:
             lbl_latest.pack(side=tk.LEFT, padx=4)
             lbl_status = tk.Label(row, text="status: ???", width=22, anchor="w", relief="ridge")
             lbl_status.pack(side=tk.LEFT, padx=4)
+            btn = tk.Button(row, text=f"Build {name}", width=18,
+                            command=lambda n=name: self._on_build_click(n))
+            btn.pack(side=tk.LEFT, padx=4)
             self.local_labels[name] = lbl_local
             self.latest_labels[name] = lbl_latest
             self.status_labels[name] = lbl_status
-
-        # Initialize local versions display
-        self.local_labels["coreutils"].config(text=f"local: {coreutils_version}")
-        self.local_labels["bash"].config(text=f"local: {bash_version}")
-        self.local_labels["curl"].config(text=f"local: {curl_version}")
-
-        # Right: buttons (build)
-        button_frame = tk.LabelFrame(top_frame, text="Build Commands", padx=8, pady=8)
-        button_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=False, padx=6, pady=6)
-
-        self.buttons = {}
-        for name in ("coreutils", "bash", "curl"):
-            btn = tk.Button(button_frame,
-                            text=f"{BUILD_COMMANDS[name].replace('gnome-terminal -- ', '')}",
-                            width=40,
-                            command=lambda n=name: self._on_build_click(n))
-            btn.pack(pady=6)
             self.buttons[name] = btn
 
+        self.latest_versions = {}
+        self.building = set()
+        # One scheduler for the whole session, so every build shares one job budget and governor
+        self.scheduler = None
+
         # Re-check button and hint
         ctrl_frame = tk.Frame(master)
         ctrl_frame.pack(fill=tk.X, padx=12, pady=(2,8))
         self.recheck_btn = tk.Button(ctrl_frame, text="Re-check Versions (Verbose)", bg="lightblue",
                                      font=("Segoe UI", 11, "bold"), command=self.start_version_check)
         self.recheck_btn.pack(side=tk.LEFT, padx=8)
+        self.update_all_btn = tk.Button(ctrl_frame, text="Update everything",
+                                        font=("Segoe UI", 11, "bold"), command=self._on_update_all)
+        self.update_all_btn.pack(side=tk.LEFT, padx=8)
+        self.incremental_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(ctrl_frame, text="Incremental builds", variable=self.incremental_var).pack(side=tk.LEFT, padx=8)
 
         self.refresh_hint = tk.Label(ctrl_frame, text="Logs and details appear below.", anchor="w")
         self.refresh_hint.pack(side=tk.LEFT, padx=8)
@@ -317,8 +1215,31 @@ class BuildManagerGUI:
         self.status_bar = tk.Label(master, text="Ready", bd=1, relief="sunken", anchor="w")
         self.status_bar.pack(fill=tk.X, side=tk.BOTTOM)
 
-        # Start first check
-        self.start_version_check()
+        # Paint the last known versions as soon as the (cached) local probes
+        # are in; only go upstream if the saved versions are old
+        state = load_version_state()
+        if version_state_stale(state, names):
+            self.start_version_check()
+        else:
+            oldest = min(state[n]["checked_at"] for n in names)
+            self.status_bar.config(text=f"Versions from saved state, checked "
+                                        f"{(time.time() - oldest) / 60:.0f} min ago")
+        def _probe():
+            local = registry.local_versions(names)
+            self.master.after(0, lambda: self.paint_saved_state(state, local))
+        threading.Thread(target=_probe, daemon=True).start()
+
+    def paint_saved_state(self, state, local):
+        self.local_versions.update(local)
+        for name in self.local_labels:
+            self.local_labels[name].config(text=f"local: {local.get(name) or 'not installed'}")
+        for name, entry in state.items():
+            if name not in self.status_labels or not entry.get("latest"):
+                continue
+            if name in self.latest_versions:
+                continue  # a live check already reported this package
+            up = version_gt(entry["latest"], local[name]) if local.get(name) else None
+            self.update_status(name, entry["latest"], up, True)
 
     def update_status(self, name, latest, up_status, fetch_ok):
         """
@@ -328,6 +1249,8 @@ class BuildManagerGUI:
         fetch_ok: True/False
         """
         def _apply():
+            if latest:
+                self.latest_versions[name] = latest
             # latest label
             if latest:
                 self.latest_labels[name].config(text=f"latest: {latest}")
@@ -346,20 +1269,17 @@ class BuildManagerGUI:
                 lbl.config(text="up-to-date", bg="lightgreen", fg="black")
                 btn.config(bg="lightgreen")
                 self.status_bar.config(text=f"{name}: up-to-date")
+            elif fetch_ok:
+                # Upstream is known but nothing is installed to compare with
+                lbl.config(text="not installed", bg="lightgrey", fg="black")
+                btn.config(bg="SystemButtonFace")
+                self.status_bar.config(text=f"{name}: latest is {latest}")
             else:
                 # None -> fetch failed or unknown
                 lbl.config(text="fetch failed / unknown", bg="tomato", fg="white")
                 btn.config(bg="SystemButtonFace")
                 self.status_bar.config(text=f"{name}: could not determine latest version")
 
-            # always update local display (use current variable)
-            if name == "coreutils":
-                self.local_labels[name].config(text=f"local: {coreutils_version}")
-            elif name == "bash":
-                self.local_labels[name].config(text=f"local: {bash_version}")
-            elif name == "curl":
-                self.local_labels[name].config(text=f"local: {curl_version}")
-
         # schedule on main thread
         self.master.after(0, _apply)
 
@@ -376,45 +1296,105 @@ class BuildManagerGUI:
                 self.master.after(300, poll_thread)
             else:
                 self.recheck_btn.config(state='normal')
+                for name, version in checker.local_versions().items():
+                    self.local_versions[name] = version
+                    self.local_labels[name].config(text=f"local: {version or 'not installed'}")
                 log("[UI] Version check finished (background).")
         checker.start()
         self.master.after(300, poll_thread)
 
     def _on_build_click(self, name):
-        cmd = BUILD_COMMANDS.get(name)
-        if not cmd:
-            messagebox.showerror("Error", f"No command configured for {name}")
+        if name in self.building:
+            messagebox.showinfo("Build running", f"{name} is already being built.")
+            return
+        from tkinter import simpledialog
+        version = simpledialog.askstring("Build", f"{name} version to build:",
+                                         initialvalue=self.latest_versions.get(name, ""),
+                                         parent=self.master)
+        if not version:
+            return
+        self._start_builds([(name, version.strip())])
+
+    def _on_update_all(self):
+        """Build every package with an update available, all at once."""
+        targets = [(name, self.latest_versions[name]) for name in self.status_labels
+                   if self.status_labels[name].cget("text") == "UPDATE AVAILABLE"
+                   and name not in self.building]
+        if not targets:
+            messagebox.showinfo("Update everything", "No updates available (or already building).")
             return
-        # Ask for confirmation
-        if not messagebox.askyesno("Run build command", f"Run command:\n\n{cmd}\n\nThis will be executed as a shell command. Continue?"):
+        listing = "\n".join(f"{n} {v}" for n, v in targets)
+        if not messagebox.askyesno("Update everything", f"Build these now, in parallel?\n\n{listing}"):
             return
-        # run in background
-        self._run_command_async(cmd, name)
+        self._start_builds(targets)
+
+    def _start_builds(self, targets):
+        import engine
+        for name, _ in targets:
+            self.building.add(name)
+            self.buttons[name].config(state='disabled')
+        incremental = self.incremental_var.get()
+        log(f"[RUN] Starting build(s): {', '.join(f'{n} {v}' for n, v in targets)}")
+        if self.scheduler is None:
+            self.scheduler = engine.BuildScheduler(log=log, on_status=self._on_build_status)
 
-    def _run_command_async(self, cmd, name):
-        log(f"[RUN] Starting build for {name}: {cmd}")
         def _worker():
+            builds, error = [], None
             try:
-                # Use shell=True so user-provided command strings run as-is (this mirrors your earlier behavior)
-                proc = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-                out = proc.stdout.strip()
-                err = proc.stderr.strip()
-                rc = proc.returncode
-                if out:
-                    log(f"[RUN:{name}] STDOUT:\n{out}")
-                if err:
-                    log(f"[RUN:{name}] STDERR:\n{err}")
-                if rc == 0:
-                    log(f"[OK] Build command finished successfully: {cmd}")
-                    self.master.after(0, lambda: messagebox.showinfo("Build finished", f"Command finished successfully:\n\n{cmd}"))
-                else:
-                    log(f"[FAIL] Build command exited with code {rc}: {cmd}")
-                    self.master.after(0, lambda: messagebox.showerror("Build failed", f"Command exited with code {rc}:\n\n{cmd}\n\nSee log for details."))
+                for name, version in targets:
+                    builds.append(self.scheduler.submit(name, version, incremental=incremental))
             except Exception as e:
-                log(f"[ERROR] Exception while running build command: {e}")
-                self.master.after(0, lambda: messagebox.showerror("Build error", f"Exception while running command:\n\n{e}"))
+                # Those already submitted keep running and are reported as usual
+                error = e
+                log(f"[ERROR] Could not start every build: {e}")
+            builds = self.scheduler.wait(builds)
+            self.master.after(0, lambda: self._builds_finished(targets, builds, error))
         threading.Thread(target=_worker, daemon=True).start()
 
+    def _on_build_status(self, status):
+        """Called from build threads with an engine.Build.status() dict."""
+        def _apply():
+            name = status["package"]
+            lbl = self.status_labels.get(name)
+            if lbl is None:
+                return
+            if status["state"] == "failed":
+                lbl.config(text=f"build failed ({status['phase']})", bg="tomato", fg="white")
+            elif status["state"] == "done" and status["cached"]:
+                lbl.config(text="restored from cache", bg="lightgreen", fg="black")
+            elif status["state"] == "done":
+                lbl.config(text=f"built in {status['elapsed']:.0f}s", bg="lightgreen", fg="black")
+            else:
+                jobs_text = f" -j{status['jobs']}" if status["phase"] == "compile" and status["jobs"] else ""
+                frac = progress.fraction(status["progress"])
+                pct = f" {frac:.0%}" if frac is not None else ""
+                if status["progress"].get("entries"):
+                    pct += f" {status['progress']['entries']} files"
+                if status.get("throttled"):
+                    lbl.config(text=f"{status['phase']} paused ({status['elapsed']:.0f}s)",
+                               bg="khaki", fg="black")
+                else:
+                    lbl.config(text=f"{status['phase']}{jobs_text}{pct} ({status['elapsed']:.0f}s)",
+                               bg="lightblue", fg="black")
+            self.status_bar.config(text=progress.describe(status))
+        self.master.after(0, _apply)
+
+    def _builds_finished(self, targets, builds, error=None):
+        for name, _ in targets:
+            self.building.discard(name)
+            self.buttons[name].config(state='normal')
+        if error:
+            messagebox.showerror("Build error", f"Could not start every build:\n\n{error}")
+        failed = [b for b in builds if b.state != "done"]
+        if not builds:
+            return
+        if failed:
+            details = "\n\n".join(f"{b.name} {b.version}: {b.error}" for b in failed)
+            messagebox.showerror("Build failed", f"{len(failed)} build(s) failed:\n\n{details[-1500:]}\n\nSee log for details.")
+        else:
+            details = "\n".join(f"{b.name} {b.version}: {b.archive}" for b in builds)
+            messagebox.showinfo("Build finished", f"All builds finished successfully:\n\n{details}")
+
 # -----------------------------
 # Helper: make version checker update GUI properly
 # -----------------------------
@@ -425,15 +1405,132 @@ def make_update_callback(gui):
         gui.update_status(name, latest, up_status, fetch_ok)
     return callback
 
+# -----------------------------
+# Headless check (--check / --json)
+# -----------------------------
+def run_headless_check(as_json=False):
+    """
+    Run the version check in this thread and print a summary.
+    Returns the exit status: 0 all up to date, 1 update available,
+    2 at least one upstream could not be checked.
+    """
+    started = time.monotonic()
+    results = {}
+    checker = VersionChecker(
+        update_callback=lambda name, latest, up, ok: results.__setitem__(name, (latest, up, ok)))
+    checker.run()
+
+    rows = []
+    local_versions = checker.local_versions()
+    for name in checker.selected():
+        local = local_versions[name]
+        latest, up, ok = results.get(name, (None, None, False))
+        rows.append({"name": name, "local": local, "latest": latest,
+                     "update_available": up, "fetch_ok": ok})
+
+    if as_json:
+        print(json.dumps({"packages": rows,
+                          "elapsed": round(time.monotonic() - started, 3)}, indent=2))
+    else:
+        for row in rows:
+            if row["update_available"] is True:
+                status = "UPDATE AVAILABLE"
+            elif row["update_available"] is False:
+                status = "up-to-date"
+            elif row["fetch_ok"]:
+                status = "not installed"
+            else:
+                status = "fetch failed / unknown"
+            print(f"{row['name']:<12} local: {row['local'] or 'N/A':<10} "
+                  f"latest: {row['latest'] or 'N/A':<10} {status}")
+
+    if not all(row["fetch_ok"] for row in rows):
+        return 2
+    if any(row["update_available"] for row in rows):
+        return 1
+    return 0
+
+def run_artifact_command(args):
+    """--artifacts / --materialise / --gc: artifact store maintenance."""
+    import artstore
+    if args.gc:
+        artstore.gc(log=print)
+    if args.materialise:
+        package, version = args.materialise
+        try:
+            bin_folder, archive = artstore.materialise(package, version)
+        except KeyError as e:
+            print(e.args[0], file=sys.stderr)
+            return 1
+        print(f"Binaries: {bin_folder}")
+        print(f"Archive:  {archive}")
+    if args.artifacts:
+        for m in artstore.manifests():
+            size = sum(e["size"] for e in m["files"].values())
+            print(f"{m['package']:<12} {m['version']:<10} {len(m['files']):>4} files "
+                  f"{size / 1024 ** 2:>8.1f} MiB  "
+                  f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(m['created_at']))}")
+        stored, logical = artstore.usage()
+        print(f"Stored {stored / 1024 ** 2:.1f} MiB for {logical / 1024 ** 2:.1f} MiB of builds")
+    return 0
+
 # -----------------------------
 # Bootstrap
 # -----------------------------
-def main():
+def main(argv=None):
+    global _log_stream, CHECK_DEADLINE
+    import argparse
+    parser = argparse.ArgumentParser(
+        prog="redrose-maintain",
+        description="RedRose build manager. Without options, opens the GUI.")
+    parser.add_argument("--check", action="store_true",
+                        help="check upstream versions without the GUI")
+    parser.add_argument("--json", action="store_true",
+                        help="like --check, but print the result as JSON")
+    parser.add_argument("--deadline", type=float, default=CHECK_DEADLINE,
+                        help=f"overall time limit for a check in seconds (default {CHECK_DEADLINE})")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="write the log to stderr during --check")
+    parser.add_argument("--artifacts", action="store_true",
+                        help="list the builds kept in the artifact store")
+    parser.add_argument("--materialise", nargs=2, metavar=("PACKAGE", "VERSION"),
+                        help="recreate a stored build's bin folder and archive here")
+    parser.add_argument("--gc", action="store_true",
+                        help="apply the artifact retention policy and free unreferenced files")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep checking upstreams in the background and save the results "
+                             f"for the GUI (every ~{WATCH_INTERVAL}s; env REDROSE_WATCH_INTERVAL)")
+    parser.add_argument("--once", action="store_true",
+                        help="with --watch: check whatever is due once and exit")
+    parser.add_argument("--report", nargs="?", const="", metavar="PACKAGE",
+                        help="show build time trends and regressions from the build history")
+    args = parser.parse_args(argv)
+    CHECK_DEADLINE = args.deadline
+
+    if args.artifacts or args.materialise or args.gc:
+        return run_artifact_command(args)
+    if args.report is not None:
+        import telemetry
+        print("\n".join(telemetry.report(args.report or None)))
+        return 0
+
+    if args.check or args.json:
+        _log_stream = sys.stderr if args.verbose else None
+        return run_headless_check(as_json=args.json)
+    if args.watch:
+        _log_stream = sys.stderr
+        try:
+            return run_watch(once=args.once)
+        except KeyboardInterrupt:
+            return 0
+
+    _import_tk()
     root = tk.Tk()
     gui = BuildManagerGUI(root)
     # Set callback wrapper for VersionChecker (so tests could call it directly if needed)
     root.mainloop()
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
 
@@ -0,0 +1,84 @@
+"""
+Artifact packaging for the build engine.
+
+Executables are staged into the bin folder by hardlink, or by reflink when
+the source must not be shared (it is about to be stripped, or it lives in
+a persistent incremental tree that make will rewrite); a plain copy is the
+fallback. The archive is a tarball, which
+keeps permissions and symlinks, compressed with multi-threaded zstd or xz;
+zip is still available.
+"""
+import os
+import shutil
+import subprocess
+
+import fsutil
+
+# Preferred first; the first whose compressor is installed is the default
+ARCHIVE_FORMATS = ("tar.zst", "tar.xz", "tar.gz", "zip")
+COMPRESSORS = {
+    "tar.zst": ("zstd", "zstd -T0 -q"),
+    "tar.xz": ("xz", "xz -T0"),
+    "tar.gz": ("gzip", "gzip"),
+}
+
+def default_format():
+    env = os.environ.get("REDROSE_ARCHIVE_FORMAT")
+    if env in ARCHIVE_FORMATS:
+        return env
+    for fmt in ARCHIVE_FORMATS:
+        if fmt == "zip" or shutil.which(COMPRESSORS[fmt][0]):
+            return fmt
+    return "zip"
+
+def _reflink_or_copy(src, dst):
+    if subprocess.run(["cp", "--reflink=auto", "-p", src, dst],
+                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode != 0:
+        shutil.copy2(src, dst)
+
+def stage(paths, bin_folder, share=True):
+    """
+    Place paths into bin_folder without copying data where the filesystem
+    allows. With share=False the copies never alias the originals' inodes.
+    """
+    for path in paths:
+        dst = os.path.join(bin_folder, os.path.basename(path))
+        if os.path.islink(path):
+            os.symlink(os.readlink(path), dst)
+            continue
+        if share:
+            fsutil.link_or_copy(path, dst)
+        else:
+            _reflink_or_copy(path, dst)
+
+def _is_elf(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read(4) == b"\x7fELF"
+    except OSError:
+        return False
+
+def strip_binaries(bin_folder, log=print):
+    """Strip debug info and unneeded symbols from every ELF file in bin_folder."""
+    if not shutil.which("strip"):
+        log("[PACK] strip not found; binaries left unstripped")
+        return
+    targets = [os.path.join(bin_folder, f) for f in sorted(os.listdir(bin_folder))]
+    targets = [p for p in targets if not os.path.islink(p) and _is_elf(p)]
+    if targets:
+        subprocess.run(["strip", "--strip-unneeded"] + targets, check=True)
+
+def make_archive(bin_folder, base_name, fmt):
+    """Archive the contents of bin_folder as base_name.<fmt>; return its path."""
+    if fmt == "zip":
+        return shutil.make_archive(base_name, "zip", bin_folder)
+    if fmt not in COMPRESSORS:
+        raise ValueError(f"unknown archive format: {fmt}")
+    out = f"{base_name}.{fmt}"
+    names = sorted(os.listdir(bin_folder))
+    subprocess.run(["tar", "-C", bin_folder, "-I", COMPRESSORS[fmt][1], "-cf", out, "--"] + names,
+                   check=True)
+    return out
+
+def archive_path(base_name, fmt):
+    return base_name + (".zip" if fmt == "zip" else f".{fmt}")
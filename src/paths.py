@@ -0,0 +1,7 @@
+"""Per-user cache and state locations shared by the manager and the builders."""
+import os
+
+CACHE_DIR = os.environ.get("REDROSE_CACHE_DIR") or os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "redrose-maintain")
+STATE_DIR = os.environ.get("REDROSE_STATE_DIR") or os.path.join(
+    os.environ.get("XDG_STATE_HOME") or os.path.expanduser("~/.local/state"), "redrose-maintain")
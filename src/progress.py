@@ -0,0 +1,111 @@
+"""
+Measured build progress, shared by the builders and the GUI.
+
+A Build reports progress as a dict {"done", "total", "unit"}: bytes
+against Content-Length while fetching (with "entries", the archive members
+extracted so far, as the tarball is unpacked while it is read), and output
+lines while configuring
+and compiling, where the expected total is the line count the same phase
+produced last time (kept in STATE_DIR/progress.json). The first build of a
+package has no estimate, so only counts and elapsed time are shown.
+
+TerminalProgress renders the status dicts of one or more builds as a
+single redrawn line.
+"""
+import os
+import sys
+import threading
+import time
+
+import fsutil
+from paths import STATE_DIR
+
+HISTORY_FILE = os.path.join(STATE_DIR, "progress.json")
+BAR_WIDTH = 30
+
+_history_lock = threading.Lock()
+
+def _history_key(package, phase, incremental):
+    return f"{package}/{phase}/{'incremental' if incremental else 'clean'}"
+
+def _load_history():
+    return fsutil.read_json(HISTORY_FILE, {})
+
+def expected_lines(package, phase, incremental=False):
+    """Lines of output phase produced in the last successful build, or None."""
+    with _history_lock:
+        return _load_history().get(_history_key(package, phase, incremental))
+
+def record_lines(package, phase, incremental, lines):
+    with _history_lock:
+        history = _load_history()
+        history[_history_key(package, phase, incremental)] = lines
+        fsutil.write_json(HISTORY_FILE, history)
+
+def fraction(progress):
+    """Completed fraction of a progress dict, or None if there is no total."""
+    if not progress or not progress.get("total"):
+        return None
+    # A build may print more than last time; hold at 99% until the phase ends
+    return min(progress["done"] / progress["total"], 0.99)
+
+def _amount(n, unit, total=None):
+    if unit == "bytes":
+        mib = f"{n / 1024 ** 2:.1f}"
+        return f"{mib}/{total / 1024 ** 2:.1f} MiB" if total else f"{mib} MiB"
+    return f"{n}/{total} {unit}" if total else f"{n} {unit}"
+
+def describe(status):
+    """One-line summary of a Build.status() dict."""
+    phase = status["phase"]
+    if status["phase"] == "compile" and status["jobs"]:
+        phase += f" -j{status['jobs']}"
+    p = status.get("progress") or {}
+    frac = fraction(p)
+    if frac is not None:
+        detail = f" {frac:4.0%} ({_amount(p['done'], p['unit'], p['total'])})"
+    elif p.get("done"):
+        detail = f" {_amount(p['done'], p['unit'])}"
+    else:
+        detail = ""
+    if p.get("entries"):
+        detail += f", {p['entries']} files extracted"
+    throttled = f" [{status['throttled']}]" if status.get("throttled") else ""
+    return f"{status['package']} {status['version']}: {phase}{detail} {status['elapsed']:.0f}s{throttled}"
+
+def bar(frac, width=BAR_WIDTH):
+    filled = int((frac or 0) * width)
+    return "█" * filled + "░" * (width - filled)
+
+class TerminalProgress:
+    """on_status callback drawing every build's progress on one terminal line."""
+    def __init__(self, stream=None, interval=0.1):
+        self.stream = stream or sys.stdout
+        self.interval = interval
+        self._statuses = {}
+        self._last = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, status):
+        with self._lock:
+            self._statuses[status["package"]] = status
+            now = time.monotonic()
+            if now - self._last < self.interval and status["state"] == "running":
+                return
+            self._last = now
+            parts = []
+            for st in self._statuses.values():
+                frac = fraction(st.get("progress"))
+                parts.append(f"[{bar(frac, 12 if len(self._statuses) > 1 else BAR_WIDTH)}] {describe(st)}")
+            self.stream.write("\r\033[2K" + "  ".join(parts))
+            self.stream.flush()
+
+    def finish(self):
+        with self._lock:
+            if self._statuses:
+                self.stream.write("\n")
+                self.stream.flush()
+
+def phase_summary(build):
+    """'fetch 1.2s, configure 20.3s, ...' for a finished Build."""
+    return ", ".join(f"{phase} {secs:.1f}s" for phase, secs in build.phase_times.items())
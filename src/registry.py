@@ -0,0 +1,151 @@
+"""
+Registry of the packages RedRose maintains.
+
+Packages are declared in packages.json (next to this module, or the file
+named by REDROSE_PACKAGES). Each entry gives:
+
+  source  where upstream publishes versions: {"type": "github-tags",
+          "repo": ...} or {"type": "regex", "url": ..., "regex": ...,
+          "pick": "max" | "first", "comment": optional comment prefix}
+  recipe  how to build it (the keyword arguments of engine.Recipe)
+  probe   how to find the installed version: {"command": [...], "regex":
+          ...}, the first group of the regex being the version
+
+Installed versions are probed concurrently. Results are cached in
+CACHE_DIR/probes.json by the binary's resolved path, mtime and size, so a
+probe only runs again once the binary changes. Only one caller probes at a
+time; others wait for it and are then answered from the cache.
+"""
+import contextlib
+import json
+import os
+import re
+import shutil
+import threading
+
+import fsutil
+from paths import CACHE_DIR
+
+MANIFEST = os.environ.get("REDROSE_PACKAGES") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "packages.json")
+PROBE_CACHE = os.path.join(CACHE_DIR, "probes.json")
+PROBE_TIMEOUT = 5
+PROBE_WORKERS = 16
+SOURCE_TYPES = ("github-tags", "regex")
+
+class RegistryError(Exception):
+    pass
+
+class Package:
+    def __init__(self, name, source, recipe, probe=None):
+        if source.get("type") not in SOURCE_TYPES:
+            raise RegistryError(f"{name}: unknown source type {source.get('type')!r}")
+        self.name = name
+        self.source = source
+        self.recipe = recipe
+        self.probe = probe
+
+    def probe_regex(self):
+        return re.compile(self.probe["regex"], re.MULTILINE)
+
+_packages = None
+_packages_lock = threading.Lock()
+
+def packages():
+    """{name: Package} in manifest order, loaded once."""
+    global _packages
+    with _packages_lock:
+        if _packages is None:
+            try:
+                with open(MANIFEST, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                raise RegistryError(f"cannot read package manifest {MANIFEST}: {e}")
+            _packages = {name: Package(name, entry["source"], entry["recipe"], entry.get("probe"))
+                         for name, entry in data["packages"].items()}
+        return _packages
+
+def names():
+    return list(packages())
+
+def get(name):
+    pkg = packages().get(name)
+    if pkg is None:
+        raise RegistryError(f"unknown package {name}")
+    return pkg
+
+def _resolve(pkg):
+    """(real path, mtime_ns, size) of the probe's binary, or None if it is not installed."""
+    if not pkg.probe:
+        return None
+    binary = shutil.which(pkg.probe["command"][0])
+    if not binary:
+        return None
+    binary = os.path.realpath(binary)
+    st = os.stat(binary)
+    return binary, st.st_mtime_ns, st.st_size
+
+def _run_probe(pkg):
+    import subprocess
+    try:
+        proc = subprocess.run(pkg.probe["command"], stdout=subprocess.PIPE,
+                              stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+                              text=True, errors="replace", timeout=PROBE_TIMEOUT)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    m = pkg.probe_regex().search(proc.stdout)
+    return m.group(1) if m else None
+
+def _load_probe_cache():
+    return fsutil.read_json(PROBE_CACHE, {})
+
+def _save_probe_cache(cache):
+    fsutil.write_json(PROBE_CACHE, cache)
+
+def local_versions(selected=None):
+    """{name: installed version or None} for selected packages (default: all)."""
+    selected = names() if selected is None else list(selected)
+    # One prober at a time (threads and processes): a caller arriving while
+    # another probes waits, then finds the results in the cache
+    with contextlib.ExitStack() as stack:
+        try:
+            stack.enter_context(fsutil.locked(PROBE_CACHE))
+            save = True
+        except OSError:
+            save = False  # unwritable cache dir: probe without caching
+        return _probe_locked(selected, save)
+
+def _probe_locked(selected, save=True):
+    from concurrent.futures import ThreadPoolExecutor
+    cache = _load_probe_cache()
+    versions = {}
+    to_probe = []
+    for name in selected:
+        pkg = get(name)
+        try:
+            found = _resolve(pkg)
+        except OSError:
+            found = None
+        if found is None:
+            versions[name] = None
+            continue
+        binary, mtime_ns, size = found
+        # Keyed by package too: one binary (e.g. a multicall coreutils) may serve several
+        key = f"{name}:{binary}"
+        entry = cache.get(key)
+        if entry and entry["mtime_ns"] == mtime_ns and entry["size"] == size:
+            versions[name] = entry["version"]
+        else:
+            to_probe.append((name, key, mtime_ns, size))
+    if to_probe:
+        with ThreadPoolExecutor(max_workers=min(PROBE_WORKERS, len(to_probe))) as pool:
+            results = pool.map(lambda item: _run_probe(get(item[0])), to_probe)
+            for (name, key, mtime_ns, size), version in zip(to_probe, results):
+                versions[name] = version
+                cache[key] = {"mtime_ns": mtime_ns, "size": size, "version": version}
+        if save:
+            try:
+                _save_probe_cache(cache)
+            except OSError:
+                pass
+    return versions
@@ -0,0 +1,68 @@
+"""
+Streaming subprocess runner shared by the build manager and the builders.
+
+stdout and stderr are read concurrently, line by line, and handed to a
+callback as they arrive; only a bounded tail is kept for error reports.
+The process is reaped with wait4, so the result also carries the CPU time
+and peak RSS of the command and the children it waited for.
+"""
+import collections
+import os
+import subprocess
+import threading
+import time
+
+# Lines of output kept for error reporting
+TAIL_LINES = 200
+
+class RunResult:
+    def __init__(self, returncode, elapsed, tail, cpu_time=0.0, max_rss=0):
+        self.returncode = returncode
+        self.elapsed = elapsed
+        self.tail = tail  # list of (stream, line), oldest first
+        self.cpu_time = cpu_time  # user + system seconds
+        self.max_rss = max_rss  # bytes, largest single process
+
+    def tail_text(self, limit=40):
+        return "\n".join(f"[{stream}] {line}" for stream, line in self.tail[-limit:])
+
+def run_streaming(cmd, on_line=None, shell=False, cwd=None, env=None, tail_lines=TAIL_LINES,
+                  on_start=None):
+    """
+    Run cmd and call on_line(stream, line) for each line of output as it
+    arrives (stream is "stdout" or "stderr"; called from reader threads).
+    on_start(proc), if given, is called once the process is started.
+    Returns a RunResult once the process has exited.
+    """
+    started = time.monotonic()
+    tail = collections.deque(maxlen=tail_lines)
+    tail_lock = threading.Lock()
+    proc = subprocess.Popen(cmd, shell=shell, cwd=cwd, env=env,
+                            stdin=subprocess.DEVNULL,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            text=True, errors="replace", bufsize=1)
+    if on_start:
+        on_start(proc)
+
+    def _reader(pipe, stream):
+        with pipe:
+            for line in pipe:
+                line = line.rstrip("\n")
+                with tail_lock:
+                    tail.append((stream, line))
+                if on_line:
+                    on_line(stream, line)
+
+    readers = [threading.Thread(target=_reader, args=(proc.stdout, "stdout"), daemon=True),
+               threading.Thread(target=_reader, args=(proc.stderr, "stderr"), daemon=True)]
+    for t in readers:
+        t.start()
+    try:
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = returncode = os.waitstatus_to_exitcode(status)
+        cpu_time, max_rss = usage.ru_utime + usage.ru_stime, usage.ru_maxrss * 1024
+    except ChildProcessError:
+        returncode, cpu_time, max_rss = proc.wait(), 0.0, 0
+    for t in readers:
+        t.join()
+    return RunResult(returncode, time.monotonic() - started, list(tail), cpu_time, max_rss)
@@ -0,0 +1,335 @@
+"""
+Shared cache of upstream source tarballs, and a streaming fetch-and-extract
+stage built on it.
+
+Tarballs are stored as sources/<package>/<version>/<sha256>/<file> and
+listed in sources/index.json. A cached tarball whose SHA-256 still matches
+is returned without any network I/O. New downloads resume from a .part
+file, are checked against the upstream detached signature (when gpg is
+available) or a pinned SHA-256, and the least recently used entries are
+evicted once the cache grows past SOURCE_CACHE_MAX_BYTES.
+
+fetch_and_extract() unpacks the archive while it is still downloading,
+teeing the bytes into the cache, so network and decompression overlap and
+the archive is never read back from disk.
+"""
+import contextlib
+import io
+import os
+import shutil
+import subprocess
+import tarfile
+import time
+import urllib.error
+import urllib.request
+
+import fsutil
+from paths import CACHE_DIR
+
+SOURCE_CACHE_DIR = os.path.join(CACHE_DIR, "sources")
+SOURCE_CACHE_MAX_BYTES = int(os.environ.get("REDROSE_SOURCE_CACHE_MAX", 2 * 1024 ** 3))
+DOWNLOAD_TIMEOUT = 30
+CHUNK_SIZE = 256 * 1024
+
+class SourceError(Exception):
+    pass
+
+@contextlib.contextmanager
+def _locked_index():
+    """Yield the index dict under an exclusive lock; it is saved on exit."""
+    path = os.path.join(SOURCE_CACHE_DIR, "index.json")
+    with fsutil.locked(path):
+        index = fsutil.read_json(path, {})
+        yield index
+        fsutil.write_json(path, index)
+
+def _download(url, dest, log):
+    """Download url to dest, resuming from dest.part if a previous attempt left one."""
+    part = dest + ".part"
+    offset = os.path.getsize(part) if os.path.exists(part) else 0
+    req = urllib.request.Request(url, headers={"User-Agent": "redrose-maintain"})
+    if offset:
+        req.add_header("Range", f"bytes={offset}-")
+    try:
+        resp = urllib.request.urlopen(req, timeout=DOWNLOAD_TIMEOUT)
+    except urllib.error.HTTPError as e:
+        if e.code != 416:  # 416: .part already holds the whole file
+            raise
+        os.replace(part, dest)
+        return
+    with resp:
+        if offset and resp.status == 206:
+            log(f"[SRC] Resuming {url} at {offset} bytes")
+            mode = "ab"
+        else:
+            mode = "wb"
+        with open(part, mode) as f:
+            shutil.copyfileobj(resp, f, CHUNK_SIZE)
+    os.replace(part, dest)
+
+def _verify_signature(path, sig_url, log):
+    """
+    Check path against the detached signature at sig_url with gpg.
+    Returns True if verified, False if it could not be checked (no gpg, no
+    key, no signature); raises SourceError on a bad signature.
+    """
+    if not sig_url or not shutil.which("gpg"):
+        return False
+    sig_path = path + os.path.splitext(sig_url)[1]
+    try:
+        _download(sig_url, sig_path, log)
+    except (OSError, urllib.error.URLError) as e:
+        log(f"[SRC] Could not fetch signature {sig_url}: {e}")
+        return False
+    try:
+        proc = subprocess.run(["gpg", "--batch", "--verify", sig_path, path],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    finally:
+        os.remove(sig_path)
+    if proc.returncode == 0:
+        return True
+    if proc.returncode == 1:
+        raise SourceError(f"bad signature for {os.path.basename(path)}: {proc.stderr.strip()}")
+    log(f"[SRC] Signature not checked (gpg: {proc.stderr.strip().splitlines()[-1:]})")
+    return False
+
+def _evict(index, keep, log):
+    total = sum(e["size"] for e in index.values())
+    for key, entry in sorted(index.items(), key=lambda kv: kv[1]["used_at"]):
+        if total <= SOURCE_CACHE_MAX_BYTES:
+            break
+        if key == keep:
+            continue
+        shutil.rmtree(os.path.dirname(entry["path"]), ignore_errors=True)
+        del index[key]
+        total -= entry["size"]
+        log(f"[SRC] Evicted {key} from source cache")
+
+def _admit(tmp_path, work_dir, sig_url, sha256, log):
+    """Verify a finished download and move it to its content-addressed place."""
+    filename = os.path.basename(tmp_path)
+    digest = fsutil.sha256_file(tmp_path)
+    if sha256 and digest != sha256:
+        os.remove(tmp_path)
+        raise SourceError(f"SHA-256 mismatch for {filename}: expected {sha256}, got {digest}")
+    try:
+        verified = _verify_signature(tmp_path, sig_url, log) or bool(sha256)
+    except SourceError:
+        os.remove(tmp_path)
+        raise
+    final_dir = os.path.join(work_dir, digest)
+    os.makedirs(final_dir, exist_ok=True)
+    final_path = os.path.join(final_dir, filename)
+    os.replace(tmp_path, final_path)
+    return final_path, digest, verified
+
+def _record(package, version, url, final_path, digest, verified, log):
+    key = f"{package}/{version}/{os.path.basename(final_path)}"
+    with _locked_index() as index:
+        index[key] = {"path": final_path, "sha256": digest, "size": os.path.getsize(final_path),
+                      "url": url, "verified": verified, "used_at": time.time()}
+        _evict(index, key, log)
+    log(f"[SRC] Cached {key} ({digest[:12]}, {'verified' if verified else 'unverified'})")
+
+def cached_sha256(package, version, url):
+    """SHA-256 of the cached tarball for url, or None if it is not cached."""
+    with _locked_index() as index:
+        entry = index.get(f"{package}/{version}/{url.rsplit('/', 1)[-1]}")
+    return entry["sha256"] if entry else None
+
+def fetch_source(package, version, url, sig_url=None, sha256=None, log=print):
+    """
+    Return the path of a verified local copy of url, downloading it only
+    if the cache has no intact copy. sha256, when given, must match.
+    """
+    filename = url.rsplit("/", 1)[-1]
+    key = f"{package}/{version}/{filename}"
+
+    with _locked_index() as index:
+        entry = index.get(key)
+        if entry and os.path.isfile(entry["path"]) and (not sha256 or entry["sha256"] == sha256):
+            if fsutil.sha256_file(entry["path"]) == entry["sha256"]:
+                entry["used_at"] = time.time()
+                log(f"[SRC] Cache hit: {key} ({entry['sha256'][:12]})")
+                return entry["path"]
+            log(f"[SRC] Cached {key} is corrupt, downloading again")
+        if entry:
+            shutil.rmtree(os.path.dirname(entry["path"]), ignore_errors=True)
+            del index[key]
+
+    # Download outside the index lock; the .part file lives per package/version
+    work_dir = os.path.join(SOURCE_CACHE_DIR, package, version)
+    tmp_path = os.path.join(work_dir, filename)
+    with fsutil.locked(tmp_path):
+        log(f"[SRC] Downloading {url}")
+        _download(url, tmp_path, log)
+        final_path, digest, verified = _admit(tmp_path, work_dir, sig_url, sha256, log)
+
+    _record(package, version, url, final_path, digest, verified, log)
+    return final_path
+
+class _TeeReader:
+    """
+    File-like reader over an optional already-downloaded prefix followed by
+    the network stream; bytes from the stream are copied to sink.
+    """
+    def __init__(self, prefix, stream, sink=None, on_read=None):
+        self._prefix = prefix
+        self._stream = stream
+        self._sink = sink
+        self._on_read = on_read
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        if self._prefix is not None:
+            data = self._prefix.read(size)
+            if data:
+                self._count(data)
+                return data
+            self._prefix.close()
+            self._prefix = None
+        data = self._stream.read(size)
+        if data and self._sink:
+            self._sink.write(data)
+        self._count(data)
+        return data
+
+    def _count(self, data):
+        self.bytes_read += len(data)
+        if self._on_read and data:
+            self._on_read(self.bytes_read)
+
+    def drain(self):
+        while self.read(CHUNK_SIZE):
+            pass
+
+    def close(self):
+        if self._prefix is not None:
+            self._prefix.close()
+        self._stream.close()
+
+def _extract_stream(fileobj, dest_dir, on_entry=None):
+    """
+    Extract a (possibly compressed) tar stream into dest_dir; return its
+    top-level dir. on_entry(count) is called after each member.
+    """
+    top = None
+    with tarfile.open(fileobj=fileobj, mode="r|*") as tar:
+        for count, member in enumerate(tar, 1):
+            name = member.name
+            while name.startswith("./"):
+                name = name[2:]
+            name = name.split("/", 1)[0]
+            if name and top is None:
+                top = name
+            if hasattr(tarfile, "tar_filter"):
+                tar.extract(member, dest_dir, filter="tar")
+            else:
+                tar.extract(member, dest_dir)
+            if on_entry:
+                on_entry(count)
+    return os.path.join(dest_dir, top) if top else dest_dir
+
+def fetch_and_extract(package, version, url, dest_dir, sig_url=None, sha256=None,
+                      cache=True, log=print, progress=None):
+    """
+    Unpack the tarball at url into dest_dir and return the extracted
+    top-level directory. A cached copy is unpacked straight from disk;
+    otherwise the download is decompressed and unpacked as it arrives and,
+    if cache is true, teed into the source cache. The signature/checksum is
+    checked once the stream ends; on failure the extracted tree is removed.
+
+    progress, if given, is called as progress(bytes_read, total_bytes,
+    entries, from_cache) while the archive is read; total_bytes is None
+    when unknown.
+    """
+    state = {"bytes": 0, "total": None, "entries": 0, "cached": False}
+    def on_read(n):
+        state["bytes"] = n
+        if progress:
+            progress(n, state["total"], state["entries"], state["cached"])
+    def on_entry(n):
+        state["entries"] = n
+        if progress:
+            progress(state["bytes"], state["total"], n, state["cached"])
+
+    filename = url.rsplit("/", 1)[-1]
+    key = f"{package}/{version}/{filename}"
+    if cache:
+        with _locked_index() as index:
+            entry = index.get(key)
+            cached = (entry and os.path.isfile(entry["path"])
+                      and (not sha256 or entry["sha256"] == sha256))
+        if cached:
+            # fetch_source re-checks the hash (and refetches if it is corrupt)
+            path = fetch_source(package, version, url, sig_url, sha256, log)
+            state["total"] = os.path.getsize(path)
+            state["cached"] = True
+            with open(path, "rb") as f:
+                return _extract_stream(_TeeReader(None, f, on_read=on_read), dest_dir, on_entry)
+
+    work_dir = os.path.join(SOURCE_CACHE_DIR, package, version)
+    tmp_path = os.path.join(work_dir, filename)
+    with fsutil.locked(tmp_path) if cache else contextlib.nullcontext():
+        part = tmp_path + ".part"
+        prefix = None
+        offset = 0
+        if cache and os.path.exists(part):
+            offset = os.path.getsize(part)
+        req = urllib.request.Request(url, headers={"User-Agent": "redrose-maintain"})
+        if offset:
+            req.add_header("Range", f"bytes={offset}-")
+        complete = False
+        try:
+            resp = urllib.request.urlopen(req, timeout=DOWNLOAD_TIMEOUT)
+        except urllib.error.HTTPError as e:
+            if not (offset and e.code == 416):
+                raise
+            # 416: .part already holds the whole file (an earlier run died before renaming it)
+            log(f"[SRC] {part} is already complete; extracting it")
+            complete = True
+            prefix = open(part, "rb")
+            resp = io.BytesIO()
+            state["total"] = offset
+        if complete:
+            sink = None
+        else:
+            if offset and resp.status == 206:
+                log(f"[SRC] Resuming {url} at {offset} bytes")
+                prefix = open(part, "rb")
+                mode = "ab"
+            else:
+                mode = "wb"
+            log(f"[SRC] Streaming {url} into {dest_dir}")
+            length = resp.headers.get("Content-Length")
+            if length and length.isdigit():
+                state["total"] = int(length) + (offset if prefix else 0)
+            sink = open(part, mode) if cache else None
+
+        reader = _TeeReader(prefix, resp, sink, on_read)
+        try:
+            top = _extract_stream(reader, dest_dir, on_entry)
+            # Keep the trailing padding so the cached archive is byte-exact
+            reader.drain()
+        except (tarfile.TarError, EOFError, OSError):
+            if complete:
+                # Not the whole file after all: start over on the next attempt
+                os.remove(part)
+            raise
+        finally:
+            reader.close()
+            if sink:
+                sink.close()
+        log(f"[SRC] Extracted {filename} ({reader.bytes_read} bytes read)")
+
+        if not cache:
+            return top
+        os.replace(part, tmp_path)
+        try:
+            final_path, digest, verified = _admit(tmp_path, work_dir, sig_url, sha256, log)
+        except SourceError:
+            shutil.rmtree(top, ignore_errors=True)
+            raise
+
+    _record(package, version, url, final_path, digest, verified, log)
+    return top
@@ -0,0 +1,142 @@
+"""
+Build telemetry history and reports.
+
+Every finished build appends one JSON line to STATE_DIR/builds.jsonl with
+its settings (jobs, incremental, archive format), host (name, arch, CPUs,
+kernel, toolchain) and, per phase, wall time, CPU time (the build thread
+plus every command it ran) and the peak RSS of any single command, along
+with the bytes downloaded.
+
+report() groups successful builds by package, version and settings and
+flags versions whose median wall time regressed against the previous
+version built with the same settings on the same host.
+"""
+import json
+import os
+import platform
+import socket
+import statistics
+import threading
+
+import incremental
+import jobs
+from paths import STATE_DIR
+from versions import version_key
+
+HISTORY_FILE = os.path.join(STATE_DIR, "builds.jsonl")
+# Median wall time this much above the previous version's counts as a regression
+REGRESSION_THRESHOLD = float(os.environ.get("REDROSE_REGRESSION_THRESHOLD", 1.15))
+
+# Report order (the history stores phases with sorted keys)
+PHASES = ("cache", "fetch", "configure", "compile", "package")
+
+_lock = threading.Lock()
+
+def host_info():
+    return {"hostname": socket.gethostname(), "machine": platform.machine(),
+            "cpus": jobs.cpu_count(), "kernel": platform.release(),
+            "toolchain": incremental.toolchain_id()}
+
+def record(entry):
+    """Append one build record to the history file."""
+    line = json.dumps(entry, sort_keys=True) + "\n"
+    with _lock:
+        os.makedirs(STATE_DIR, exist_ok=True)
+        with open(HISTORY_FILE, "a", encoding="utf-8") as f:
+            f.write(line)
+
+def history(package=None):
+    """All recorded builds (of one package, if given), oldest first."""
+    entries = []
+    try:
+        with open(HISTORY_FILE, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # a torn line from an interrupted write
+                if not package or entry.get("package") == package:
+                    entries.append(entry)
+    except OSError:
+        pass
+    return entries
+
+def settings_label(entry):
+    mode = "cached" if entry["cached"] else ("incremental" if entry["incremental"] else "clean")
+    return f"-j{entry['jobs']} {mode}"
+
+def _groups(entries):
+    """{(package, host, settings): {version: [entries]}} for successful builds."""
+    groups = {}
+    for e in entries:
+        if e["state"] != "done":
+            continue
+        key = (e["package"], e["host"]["hostname"], settings_label(e))
+        groups.setdefault(key, {}).setdefault(e["version"], []).append(e)
+    return groups
+
+def _median(entries, field):
+    return statistics.median(e[field] for e in entries)
+
+def _phase_line(entries):
+    phases = {}
+    for e in entries:
+        for name, stats in e["phases"].items():
+            phases.setdefault(name, []).append(stats["wall"])
+    order = sorted(phases, key=lambda p: PHASES.index(p) if p in PHASES else len(PHASES))
+    return ", ".join(f"{name} {statistics.median(phases[name]):.1f}s" for name in order)
+
+def report(package=None):
+    """Return the report as a list of lines."""
+    entries = history(package)
+    if not entries:
+        return [f"No builds recorded in {HISTORY_FILE}"]
+    lines = []
+    regressions = []
+    for (pkg, host, settings), by_version in sorted(_groups(entries).items()):
+        lines.append(f"{pkg} on {host}, {settings}:")
+        previous = None
+        for version in sorted(by_version, key=lambda v: (version_key(v), v)):
+            runs = by_version[version]
+            wall = _median(runs, "wall")
+            cpu = _median(runs, "cpu")
+            rss = max(e["peak_rss"] for e in runs)
+            change = ""
+            if previous:
+                ratio = wall / previous[1] if previous[1] else 1.0
+                change = f" ({ratio - 1:+.0%} vs {previous[0]})"
+                if ratio > REGRESSION_THRESHOLD:
+                    regressions.append(f"{pkg} {version} on {host} ({settings}): "
+                                       f"{wall:.1f}s vs {previous[1]:.1f}s for {previous[0]}")
+            lines.append(f"  {version:<10} n={len(runs):<3} wall {wall:7.1f}s  cpu {cpu:7.1f}s  "
+                         f"rss {rss / 1024 ** 2:6.0f} MiB{change}")
+            lines.append(f"  {'':<10} {_phase_line(runs)}")
+            previous = (version, wall)
+
+    # Same package and version built with different settings
+    by_build = {}
+    for e in entries:
+        if e["state"] == "done" and not e["cached"]:
+            by_build.setdefault((e["package"], e["version"]), {}).setdefault(
+                settings_label(e), []).append(e)
+    compared = [(k, v) for k, v in sorted(by_build.items()) if len(v) > 1]
+    if compared:
+        lines.append("")
+        lines.append("Settings compared:")
+        for (pkg, version), by_settings in compared:
+            ranked = sorted(by_settings.items(), key=lambda kv: _median(kv[1], "wall"))
+            lines.append(f"  {pkg} {version}: " + ", ".join(
+                f"{label} {_median(runs, 'wall'):.1f}s" for label, runs in ranked))
+
+    failed = [e for e in entries if e["state"] != "done"]
+    if failed:
+        lines.append("")
+        lines.append(f"{len(failed)} failed build(s); last: {failed[-1]['package']} "
+                     f"{failed[-1]['version']} in {failed[-1]['failed_phase']}")
+    lines.append("")
+    if regressions:
+        lines.append(f"Regressions (wall time > {REGRESSION_THRESHOLD:.2f}x the previous version):")
+        lines.extend(f"  {r}" for r in regressions)
+    else:
+        lines.append("No regressions.")
+    return lines
@@ -0,0 +1,46 @@
+"""
+Version ordering shared by the version checker and the build reports.
+
+Keys are tuples of ints only, so mixed tags never hit a str/int
+comparison: (release, stage, stage number), with trailing zero components
+dropped so 9.5 == 9.5.0, and final > rc > beta > alpha (9.5-rc1 < 9.5).
+"""
+import functools
+import re
+
+_VERSION_RE = re.compile(
+    r"^v?(?P<release>\d+(?:\.\d+)*)"
+    r"(?:[.\-_]?(?P<stage>alpha|beta|pre|rc|a|b|c)[.\-_]?(?P<num>\d*))?$", re.IGNORECASE)
+_STAGE_RANK = {"a": 0, "alpha": 0, "b": 1, "beta": 1, "pre": 2, "c": 3, "rc": 3}
+FINAL_RANK = 4
+
+@functools.lru_cache(maxsize=65536)
+def version_key(v):
+    """
+    Sort key for a version or tag string. Strings that are not versions
+    get an empty release and sort below every real version.
+    """
+    m = _VERSION_RE.match(str(v).strip())
+    if not m:
+        return ((), -1, 0)
+    release = [int(p) for p in m.group("release").split(".")]
+    while len(release) > 1 and release[-1] == 0:
+        release.pop()
+    stage = m.group("stage")
+    if stage is None:
+        return (tuple(release), FINAL_RANK, 0)
+    return (tuple(release), _STAGE_RANK[stage.lower()], int(m.group("num") or 0))
+
+def is_version(v):
+    return bool(version_key(v)[0])
+
+def version_gt(a, b):
+    return version_key(a) > version_key(b)
+
+def latest_version(tags, stable_only=True):
+    """Highest version among tags (leading 'v' dropped), skipping pre-releases if asked."""
+    candidates = [t for t in tags if is_version(t)
+                  and (not stable_only or version_key(t)[1] == FINAL_RANK)]
+    if not candidates:
+        return None
+    return max(candidates, key=version_key).lstrip("vV")
@@ -0,0 +1,192 @@
+"""
+Scratch workspaces for clean builds.
+
+A clean build extracts and compiles in a throwaway workspace instead of the
+output dir; only the staged binaries and the archive are written to the
+output dir. The workspace goes on tmpfs (XDG_RUNTIME_DIR, then /dev/shm;
+noexec mounts are skipped, as configure runs what it compiles) when it has
+room for the expected tree and enough memory is left over for the
+compilers, else on a local scratch disk (REDROSE_SCRATCH_DIR, else
+/var/tmp, else CACHE_DIR/scratch).
+
+The expected size is the package's last measured tree (kept in
+STATE_DIR/workspace.json), or DEFAULT_ESTIMATE for a package never built.
+
+A workspace is removed once the build succeeds, and kept for debugging when
+the build fails after fetching (a failed fetch leaves nothing worth
+reading). A kept workspace on tmpfs is moved to disk so it does not hold
+memory. Kept ones older than KEEP_DAYS are pruned when the next one is
+made. REDROSE_WORKSPACE picks the placement: auto (default), ram or disk.
+"""
+import os
+import shutil
+import tempfile
+import time
+
+import fsutil
+import jobs
+from paths import CACHE_DIR, STATE_DIR
+
+MODES = ("auto", "ram", "disk")
+DEFAULT_MODE = os.environ.get("REDROSE_WORKSPACE", "auto")
+PREFIX = "redrose-build-"
+SIZE_FILE = os.path.join(STATE_DIR, "workspace.json")
+# Expected tree size of a package not built before
+DEFAULT_ESTIMATE = 1024 ** 3
+# Memory that must stay available for the compilers once the tree is in RAM
+RAM_RESERVE = int(os.environ.get("REDROSE_WORKSPACE_RAM_RESERVE", 2 * 1024 ** 3))
+# A tmpfs with less than this left is treated as full when a build fails
+FULL_MARGIN = 64 * 1024 ** 2
+KEEP_DAYS = float(os.environ.get("REDROSE_WORKSPACE_KEEP_DAYS", 7))
+
+def _tmpfs_mounts():
+    """Mount points of tmpfs mounts that allow executing files (configure needs to)."""
+    usable = {}
+    try:
+        with open("/proc/mounts", "r", encoding="utf-8") as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) >= 4:
+                    # A later mount on the same point hides the earlier one
+                    usable[fields[1]] = fields[2] == "tmpfs" and "noexec" not in fields[3].split(",")
+    except OSError:
+        pass
+    return {mount for mount, ok in usable.items() if ok}
+
+def ram_dirs():
+    """Writable, exec-allowing tmpfs dirs to try, in order of preference."""
+    mounts = _tmpfs_mounts()
+    dirs = []
+    for d in (os.environ.get("XDG_RUNTIME_DIR"), "/dev/shm"):
+        if d and os.path.realpath(d) in mounts and os.access(d, os.W_OK | os.X_OK):
+            dirs.append(d)
+    return dirs
+
+def disk_dir():
+    for d in (os.environ.get("REDROSE_SCRATCH_DIR"), "/var/tmp"):
+        if d and os.path.isdir(d) and os.access(d, os.W_OK | os.X_OK):
+            return d
+    d = os.path.join(CACHE_DIR, "scratch")
+    os.makedirs(d, exist_ok=True)
+    return d
+
+def free_space(path):
+    st = os.statvfs(path)
+    return st.f_bavail * st.f_frsize
+
+def _load_sizes():
+    return fsutil.read_json(SIZE_FILE, {})
+
+def estimate(package):
+    return _load_sizes().get(package, DEFAULT_ESTIMATE)
+
+def record_size(package, size):
+    # Parallel builds finish together; each must see the others' entries
+    with fsutil.locked(SIZE_FILE):
+        sizes = _load_sizes()
+        sizes[package] = size
+        fsutil.write_json(SIZE_FILE, sizes)
+
+def tree_size(path):
+    """Bytes allocated under path (hardlinked files counted once)."""
+    total = 0
+    seen = set()
+    for root, dirs, files in os.walk(path):
+        for name in dirs + files:
+            try:
+                st = os.lstat(os.path.join(root, name))
+            except OSError:
+                continue
+            if (st.st_dev, st.st_ino) not in seen:
+                seen.add((st.st_dev, st.st_ino))
+                total += st.st_blocks * 512
+    return total
+
+def choose(package, mode=None):
+    """Return (parent dir, "ram" or "disk", reason) for a new workspace."""
+    mode = mode or DEFAULT_MODE
+    if mode not in MODES:
+        raise ValueError(f"workspace mode must be one of {', '.join(MODES)}, not {mode!r}")
+    need = estimate(package)
+    if mode != "disk":
+        available = jobs.available_memory()
+        for d in ram_dirs():
+            if mode == "ram":
+                return d, "ram", "requested"
+            if free_space(d) < need:
+                continue
+            if available is not None and available - need >= RAM_RESERVE:
+                return d, "ram", f"~{need / 1024 ** 2:.0f} MiB expected"
+        if mode == "ram":
+            return disk_dir(), "disk", "no writable tmpfs"
+    reason = "requested" if mode == "disk" else \
+        f"not enough RAM for ~{need / 1024 ** 2:.0f} MiB"
+    return disk_dir(), "disk", reason
+
+def prune(max_age_days=KEEP_DAYS, log=print):
+    """Remove kept workspaces older than max_age_days from every location."""
+    cutoff = time.time() - max_age_days * 86400
+    for parent in ram_dirs() + [disk_dir()]:
+        try:
+            entries = list(os.scandir(parent))
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if (entry.name.startswith(PREFIX) and entry.is_dir(follow_symlinks=False)
+                        and entry.stat(follow_symlinks=False).st_mtime < cutoff):
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    log(f"[WORKSPACE] Pruned {entry.path}")
+            except OSError:
+                continue
+
+class Workspace:
+    """A scratch dir for one build; see the module docstring."""
+    def __init__(self, package, version, mode=None, log=print):
+        self.package = package
+        self.log = log
+        prune(log=log)
+        parent, self.kind, reason = choose(package, mode)
+        self.path = tempfile.mkdtemp(prefix=f"{PREFIX}{package}-{version}-", dir=parent)
+        log(f"[WORKSPACE] {self.path} ({self.kind}: {reason})")
+
+    def full(self):
+        """True if the workspace's filesystem has (nearly) run out of space."""
+        try:
+            return free_space(self.path) < FULL_MARGIN
+        except OSError:
+            return False
+
+    def measure(self):
+        """Record this tree's size as the package's estimate for next time."""
+        try:
+            record_size(self.package, tree_size(self.path))
+        except OSError:
+            pass
+
+    def spill(self):
+        """tmpfs ran out: raise the package's estimate past this tree and drop it."""
+        try:
+            record_size(self.package, 2 * tree_size(self.path))
+        except OSError:
+            pass
+        self.remove()
+        self.log(f"[WORKSPACE] {os.path.dirname(self.path)} is full; retrying on disk")
+
+    def remove(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def keep(self, why="for debugging"):
+        if self.kind == "ram":
+            dest = os.path.join(disk_dir(), os.path.basename(self.path))
+            try:
+                shutil.move(self.path, dest)
+            except OSError as e:
+                self.log(f"[WORKSPACE] Could not move {self.path} to disk ({e}); removed it")
+                shutil.rmtree(dest, ignore_errors=True)
+                self.remove()
+                return
+            # KEEP_DAYS counts from now, not from when the tree was made
+            os.utime(dest)
+            self.path, self.kind = dest, "disk"
+        self.log(f"[WORKSPACE] Kept {why}: {self.path}")
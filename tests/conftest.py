@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC)
+
+# The modules read their cache/state locations at import; keep them out of ~
+_scratch = tempfile.mkdtemp(prefix="redrose-tests-")
+os.environ.setdefault("REDROSE_CACHE_DIR", os.path.join(_scratch, "cache"))
+os.environ.setdefault("REDROSE_STATE_DIR", os.path.join(_scratch, "state"))
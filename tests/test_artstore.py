@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+import artstore
+import buildcache
+
+@pytest.fixture
+def stores(tmp_path, monkeypatch):
+    monkeypatch.setattr(artstore, "ARTIFACT_DIR", str(tmp_path / "artifacts"))
+    monkeypatch.setattr(buildcache, "BUILD_CACHE_DIR", str(tmp_path / "builds"))
+    return tmp_path
+
+def _outputs(out_dir):
+    bin_folder = os.path.join(out_dir, "pkg-1.0-bin")
+    os.makedirs(bin_folder)
+    with open(os.path.join(bin_folder, "prog"), "w") as f:
+        f.write("#!/bin/sh\necho 1.0\n")
+    os.chmod(os.path.join(bin_folder, "prog"), 0o755)
+    archive = os.path.join(out_dir, "pkg-1.0-bin.tar.gz")
+    with open(archive, "wb") as f:
+        f.write(b"archive")
+    return bin_folder, archive
+
+def _leftovers(top):
+    return [os.path.join(root, name) for root, _, names in os.walk(top)
+            for name in names if name.endswith(artstore.LINK_SUFFIX)]
+
+def test_ingest_of_restored_tree_leaves_no_temp_links(stores):
+    first = stores / "first"
+    bin_folder, archive = _outputs(str(first))
+    artstore.ingest("pkg", "1.0", bin_folder, archive, log=lambda msg: None)
+    entry = buildcache.store("k" * 64, {"package": "pkg", "version": "1.0"},
+                             bin_folder, archive, log=lambda msg: None)
+
+    # A cache hit: the restored outputs are already links to the stored objects
+    again = stores / "again"
+    os.makedirs(again)
+    bin_folder, archive = buildcache.restore(entry, str(again))
+    for _ in range(2):
+        manifest = artstore.ingest("pkg", "1.0", bin_folder, archive, log=lambda msg: None)
+
+    assert _leftovers(str(stores)) == []
+    assert sorted(manifest["files"]) == ["bin/prog", "pkg-1.0-bin.tar.gz"]
+
+def test_ingest_skips_stale_temp_links(stores):
+    bin_folder, archive = _outputs(str(stores / "out"))
+    stale = os.path.join(bin_folder, "prog" + artstore.LINK_SUFFIX)
+    os.link(os.path.join(bin_folder, "prog"), stale)
+    manifest = artstore.ingest("pkg", "1.0", bin_folder, archive, log=lambda msg: None)
+    assert sorted(manifest["files"]) == ["bin/prog", "pkg-1.0-bin.tar.gz"]
+
+def test_materialise_recreates_outputs(stores):
+    bin_folder, archive = _outputs(str(stores / "out"))
+    artstore.ingest("pkg", "1.0", bin_folder, archive, log=lambda msg: None)
+    os.makedirs(stores / "again")
+    bin_folder, archive = artstore.materialise("pkg", "1.0", str(stores / "again"))
+    assert os.listdir(bin_folder) == ["prog"] and os.access(os.path.join(bin_folder, "prog"), os.X_OK)
+    with open(archive, "rb") as f:
+        assert f.read() == b"archive"
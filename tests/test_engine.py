@@ -0,0 +1,30 @@
+import os
+import types
+
+import pytest
+
+import engine
+
+def _recipe(name, collect=None):
+    return types.SimpleNamespace(name=name, collect=collect)
+
+def test_scheduler_forgets_finished_builds(monkeypatch):
+    monkeypatch.setattr(engine, "RECIPES", {n: _recipe(n) for n in ("a", "b")})
+    def run(build):
+        build.state = "done"
+    monkeypatch.setattr(engine.Build, "run", run)
+    scheduler = engine.BuildScheduler(total_jobs=2, log=lambda msg: None, govern=False)
+    first = scheduler.wait([scheduler.submit("a", "1")])
+    scheduler.submit("b", "1")
+    assert first[0] not in scheduler.builds and first[0] not in scheduler._threads
+    assert scheduler.wait(first) == first
+    assert [b.name for b in scheduler.wait()] == ["b"]
+
+def test_failed_packaging_removes_partial_outputs(tmp_path):
+    def collect(tree):
+        raise OSError("no binaries")
+    build = engine.Build(_recipe("pkg", collect), "1.0", str(tmp_path), engine.JobBudget(1),
+                         lambda: 1, log=lambda msg: None, archive_format="zip")
+    with pytest.raises(OSError):
+        build._package(str(tmp_path / "tree"))
+    assert os.listdir(tmp_path) == [] and build.bin_folder is None
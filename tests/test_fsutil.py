@@ -0,0 +1,27 @@
+import threading
+import time
+
+import fsutil
+
+def test_read_json_default_for_missing_or_corrupt(tmp_path):
+    path = str(tmp_path / "state.json")
+    assert fsutil.read_json(path) is None
+    assert fsutil.read_json(path, {}) == {}
+    (tmp_path / "state.json").write_text('{"torn": ')
+    assert fsutil.read_json(path, {}) == {}
+    fsutil.write_json(path, {"a": [1, 2]})
+    assert fsutil.read_json(path) == {"a": [1, 2]}
+
+def test_locked_excludes_other_threads(tmp_path):
+    path = str(tmp_path / "sub" / "counter.json")
+    def bump():
+        with fsutil.locked(path):
+            value = fsutil.read_json(path, 0)
+            time.sleep(0.01)
+            fsutil.write_json(path, value + 1)
+    threads = [threading.Thread(target=bump) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert fsutil.read_json(path) == 8
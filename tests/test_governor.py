@@ -0,0 +1,70 @@
+import subprocess
+
+import pytest
+
+import engine
+import governor
+
+class FakeBuild:
+    def __init__(self, name, budget, jobs, started):
+        self.recipe = engine.Recipe(name, "http://example.invalid/{version}")
+        self.name = name
+        self.state = "running"
+        self.phase = "compile"
+        self.started = started
+        self.throttled = None
+        self.tree_rss = 0
+        self.shed_to = None
+        self.budget = budget
+        self.proc = subprocess.Popen(["sleep", "30"])
+        self.pid = self.proc.pid
+        self.jobs = budget.acquire(jobs)
+        self.slots = self.jobs
+        self._slots_lent = False
+        self._slot_lock = engine.threading.Lock()
+
+    lend_slots = engine.Build.lend_slots
+    reclaim_slots = engine.Build.reclaim_slots
+
+    def _report(self):
+        pass
+
+@pytest.fixture
+def builds():
+    budget = engine.JobBudget(8)
+    made = [FakeBuild("old", budget, 4, 1.0), FakeBuild("new", budget, 4, 2.0)]
+    yield made
+    for b in made:
+        b.proc.kill()
+        b.proc.wait()
+
+def _sample(builds, monkeypatch, free, load):
+    monkeypatch.setattr(governor.jobs, "available_memory", lambda: free)
+    monkeypatch.setattr(governor.jobs, "load_average", lambda: load)
+    gov = governor.Governor(lambda: builds, log=lambda msg: None)
+    gov.sample()
+    return gov
+
+def test_high_load_pause_lends_job_slots(builds, monkeypatch):
+    old, new = builds
+    budget = old.budget
+    gov = _sample(builds, monkeypatch, free=None, load=governor.MAX_LOAD * 2)
+    assert new.throttled and not old.throttled
+    # The paused build's slots are free for the other builds
+    assert budget.acquire(8) == 4
+    budget.release(4)
+
+    monkeypatch.setattr(governor.jobs, "load_average", lambda: 0.0)
+    gov.sample()
+    assert not new.throttled
+    # Taken back on resume, even though nothing had to be waited for
+    assert budget._free == 0
+
+def test_low_memory_sheds_jobs_instead_of_pausing(builds, monkeypatch):
+    old, new = builds
+    _sample(builds, monkeypatch, free=1, load=0.0)
+    assert not old.throttled and not new.throttled
+    shed = [b for b in builds if b.shed_to]
+    assert len(shed) == 1 and shed[0].shed_to == 2
+    shed[0].proc.wait(timeout=5)
+    assert shed[0].proc.returncode < 0  # stopped by the governor
@@ -0,0 +1,180 @@
+import gzip
+import http.server
+import threading
+
+import pytest
+
+import main
+
+def _chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+@pytest.mark.parametrize("size", [1, 3, 1024])
+def test_iter_json_array_complete(size):
+    text = '[{"name": "v1.0"}, 2, "three", [4], 5.5, null]'
+    assert list(main.iter_json_array(_chunked(text, size))) == [
+        {"name": "v1.0"}, 2, "three", [4], 5.5, None]
+    assert list(main.iter_json_array(["[ ]"])) == []
+
+@pytest.mark.parametrize("text", ['[1, 2, {"name": "v3"', '[1, 2', "[1, 2,", "["])
+def test_iter_json_array_truncated(text):
+    with pytest.raises(ValueError):
+        list(main.iter_json_array(_chunked(text, 4)))
+
+@pytest.mark.parametrize("text", ["[1, 2, garbage]", "[1 2]", "[1,, 2]", "[1, 2] [3]", "{}"])
+def test_iter_json_array_malformed(text):
+    with pytest.raises(ValueError):
+        list(main.iter_json_array(_chunked(text, 4)))
+
+class _TruncatedGzip(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = gzip.compress(b'[{"name": "v1.0"}, {"name": "v2.0"}]' * 50)[:-20]
+        self.send_response(200)
+        self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def test_truncated_gzip_body_is_an_error():
+    server = http.server.HTTPServer(("127.0.0.1", 0), _TruncatedGzip)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/tags"
+        status, _, chunks, close, _ = main._ConnectionPool(1).open(url, {}, 5)
+        with pytest.raises(ValueError):
+            for _ in chunks():
+                pass
+        close()
+    finally:
+        server.shutdown()
+
+class _Upstream(http.server.BaseHTTPRequestHandler):
+    """Answers as a proxy would: records the request line it was sent."""
+    seen = []
+
+    def do_GET(self):
+        _Upstream.seen.append((self.path, self.headers.get("Proxy-Authorization")))
+        if self.path.endswith("/loop"):
+            self.send_response(302)
+            self.send_header("Location", self.path)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def upstream(monkeypatch):
+    monkeypatch.setitem(main._optional_modules, "requests", None)
+    for name in ("no_proxy", "NO_PROXY", "http_proxy", "HTTP_PROXY"):
+        monkeypatch.delenv(name, raising=False)
+    _Upstream.seen = []
+    server = http.server.HTTPServer(("127.0.0.1", 0), _Upstream)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+def test_http_fallback_uses_proxy(upstream, monkeypatch):
+    monkeypatch.setenv("http_proxy", f"http://user:secret@{upstream}")
+    status, body, _, _ = main.HttpSession(retries=0).get("http://upstream.invalid/tags?page=2")
+    assert (status, body) == (200, b"ok")
+    path, auth = _Upstream.seen[0]
+    assert path == "http://upstream.invalid/tags?page=2"
+    assert auth and auth.startswith("Basic ")
+
+def test_http_fallback_redirect_limit(upstream):
+    with pytest.raises(main.HttpError):
+        main.HttpSession(retries=0).get(f"http://{upstream}/loop")
+    assert len(_Upstream.seen) == main.HTTP_MAX_REDIRECTS + 1
+
+class _Stalled(http.server.BaseHTTPRequestHandler):
+    """Sends the headers and a first chunk, then stalls until released."""
+    release = threading.Event()
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "1000")
+        self.end_headers()
+        self.wfile.write(b"[")
+        self.wfile.flush()
+        _Stalled.release.wait(30)
+
+    def log_message(self, *args):
+        pass
+
+def test_deadline_frees_host_slots(monkeypatch):
+    monkeypatch.setitem(main._optional_modules, "requests", None)
+    monkeypatch.setattr(main, "_http_session", main.HttpSession(retries=0))
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Stalled)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/slow"
+    deadline = main.CheckDeadline(30)
+    errors = []
+    def fetch(n):
+        main._deadline_var.set(deadline)
+        try:
+            for _ in main._iter_url_bytes(f"{url}?{n}", 30):
+                pass
+        except TimeoutError as e:
+            errors.append(e)
+    threads = [threading.Thread(target=fetch, args=(n,), daemon=True)
+               for n in range(main.MAX_CONNECTIONS_PER_HOST)]
+    try:
+        for t in threads:
+            t.start()
+        while len(deadline._open) < len(threads):
+            threads[0].join(0.01)
+        deadline.expire()
+        for t in threads:
+            t.join(5)
+        assert not any(t.is_alive() for t in threads)
+        assert len(errors) == len(threads)
+        # The next check gets every slot on the same host straight away
+        slot = main._host_slots[f"127.0.0.1:{server.server_address[1]}"]
+        assert all(slot.acquire(timeout=0) for _ in threads)
+    finally:
+        _Stalled.release.set()
+        server.shutdown()
+
+class _Stop(Exception):
+    pass
+
+def test_watch_backs_off_when_state_cannot_be_saved(tmp_path, monkeypatch):
+    # A state file under a regular file can never be written
+    (tmp_path / "not-a-dir").write_text("")
+    monkeypatch.setattr(main, "VERSION_STATE_FILE", str(tmp_path / "not-a-dir" / "versions.json"))
+    monkeypatch.setattr(main, "_version_memory", {})
+    monkeypatch.setattr(main, "_log_stream", None)
+    monkeypatch.setattr(main.registry, "names", lambda: ["pkg"])
+    checked = []
+
+    class FailingChecker:
+        def __init__(self, update_callback, names):
+            self.names = names
+
+        def run(self):
+            checked.extend(self.names)
+            for name in self.names:
+                main.record_version_check(name, None)
+
+    sleeps = []
+    def sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == 2:
+            raise _Stop
+    monkeypatch.setattr(main, "VersionChecker", FailingChecker)
+    monkeypatch.setattr(main.time, "sleep", sleep)
+    with pytest.raises(_Stop):
+        main.run_watch()
+
+    assert checked == ["pkg"]  # the second round found nothing due
+    assert all(s >= main.WATCH_RETRY_MIN * (1 - main.WATCH_JITTER) - 1 for s in sleeps)
+    assert main.current_version_state()["pkg"]["failures"] == 1
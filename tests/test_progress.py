@@ -0,0 +1,21 @@
+import progress
+
+def _status(**p):
+    return {"package": "pkg", "version": "1.0", "phase": "fetch", "jobs": 0, "elapsed": 3.0,
+            "state": "running", "progress": dict(unit="bytes", **p)}
+
+def test_describe_shows_extracted_entries():
+    line = progress.describe(_status(done=2 * 1024 ** 2, total=4 * 1024 ** 2, entries=120))
+    assert "2.0/4.0 MiB" in line and "120 files extracted" in line
+    assert "files" not in progress.describe(_status(done=1024, total=None, entries=0))
+
+def test_terminal_progress_renders_extraction():
+    class Stream:
+        text = ""
+        def write(self, s):
+            self.text += s
+        def flush(self):
+            pass
+    stream = Stream()
+    progress.TerminalProgress(stream=stream)(_status(done=10, total=None, entries=7))
+    assert "7 files extracted" in stream.text
@@ -0,0 +1,19 @@
+import telemetry
+from versions import latest_version, version_key
+
+def test_prerelease_sorts_before_its_release():
+    assert sorted(["9.5", "9.5-rc1", "9.4", "9.10"], key=version_key) == \
+        ["9.4", "9.5-rc1", "9.5", "9.10"]
+    assert version_key("9.5.0") == version_key("9.5")
+    assert latest_version(["v9.5-rc1", "v9.4", "not-a-tag"]) == "9.4"
+
+def test_report_compares_release_with_its_rc(tmp_path, monkeypatch):
+    monkeypatch.setattr(telemetry, "HISTORY_FILE", str(tmp_path / "builds.jsonl"))
+    for version, wall in (("9.5", 10.0), ("9.5-rc1", 20.0), ("9.4", 20.0)):
+        telemetry.record({"package": "pkg", "version": version, "state": "done", "cached": False,
+                          "incremental": False, "jobs": 4, "wall": wall, "cpu": wall,
+                          "peak_rss": 0, "phases": {}, "host": {"hostname": "h"}})
+    lines = telemetry.report()
+    order = [line.split()[0] for line in lines if line.startswith("  9.")]
+    assert order == ["9.4", "9.5-rc1", "9.5"]
+    assert "No regressions." in lines
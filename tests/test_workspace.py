@@ -0,0 +1,18 @@
+import os
+
+import workspace
+
+def test_kept_ram_workspace_moves_to_disk(tmp_path, monkeypatch):
+    ram, disk = tmp_path / "ram", tmp_path / "disk"
+    ram.mkdir()
+    disk.mkdir()
+    monkeypatch.setattr(workspace, "ram_dirs", lambda: [str(ram)])
+    monkeypatch.setattr(workspace, "disk_dir", lambda: str(disk))
+    ws = workspace.Workspace("pkg", "1.0", mode="ram", log=lambda msg: None)
+    assert ws.kind == "ram"
+    with open(os.path.join(ws.path, "config.log"), "w") as f:
+        f.write("checking for cc... no\n")
+    ws.keep()
+    assert ws.kind == "disk" and os.path.dirname(ws.path) == str(disk)
+    assert os.listdir(ram) == []
+    assert os.listdir(ws.path) == ["config.log"]